@@ -0,0 +1,41 @@
+"""Streaming NDJSON and CSV exports"""
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Sequence
+import csv
+import io
+
+import orjson
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _ndjson(pages: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    async for page in pages:
+        yield b"".join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in page)
+
+
+async def _csv(pages: AsyncIterator[List[dict]], fields: Sequence[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue()
+    async for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(page)
+        yield buffer.getvalue()
+
+
+def export_response(
+    pages: AsyncIterator[List[dict]], fields: Sequence[str], format: str, name: str
+) -> StreamingResponse:
+    """
+    Stream records page by page, so memory use does not grow with the
+    dataset and the client receives the first page immediately.
+    """
+    body = _csv(pages, fields) if format == "csv" else _ndjson(pages)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    )
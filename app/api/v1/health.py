@@ -1,10 +1,17 @@
 from fastapi import APIRouter, status
 from datetime import datetime
-import psutil
 import platform
 
+from app.core.system import sampler
+
 router = APIRouter()
 
+SYSTEM_INFO = {
+    "platform": platform.system(),
+    "platform_version": platform.version(),
+    "python_version": platform.python_version(),
+}
+
 
 @router.get("/health", status_code=status.HTTP_200_OK)
 async def health_check():
@@ -23,33 +30,17 @@ async def health_check():
 @router.get("/health/detailed", status_code=status.HTTP_200_OK)
 async def detailed_health_check():
     """
-    Detailed health check with system metrics
+    Detailed health check with system metrics from the background sampler
     """
-    cpu_percent = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
+    metrics = sampler.snapshot or sampler.sample()
     
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "system": {
-            "platform": platform.system(),
-            "platform_version": platform.version(),
-            "python_version": platform.python_version(),
-        },
-        "metrics": {
-            "cpu_percent": cpu_percent,
-            "memory": {
-                "total_mb": round(memory.total / (1024 * 1024), 2),
-                "used_mb": round(memory.used / (1024 * 1024), 2),
-                "percent": memory.percent
-            },
-            "disk": {
-                "total_gb": round(disk.total / (1024 * 1024 * 1024), 2),
-                "used_gb": round(disk.used / (1024 * 1024 * 1024), 2),
-                "percent": disk.percent
-            }
-        }
+        "system": SYSTEM_INFO,
+        "metrics": metrics,
+        "sampled_at": datetime.utcfromtimestamp(sampler.sampled_at).isoformat(),
+        "sample_age_seconds": round(sampler.age, 3)
     }
 
 
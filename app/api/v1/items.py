@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 import uuid
 
+from app.api.v1.batch import BatchResponse, batch_response, read_rows, validate_rows
+from app.api.v1.export import export_response
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.db import storage
+from app.db.base import InsufficientStockError, pause_between_chunks
+
 router = APIRouter()
 
 
@@ -26,6 +34,18 @@ class ItemUpdate(BaseModel):
     quantity: Optional[int] = Field(None, ge=0)
     category: Optional[str] = None
 
+    @field_validator("name", "price", "quantity")
+    @classmethod
+    def not_null(cls, value):
+        # Optional only so they can be left out; these fields are required on items
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+
+class ItemBatchUpdate(ItemUpdate):
+    id: str
+
 
 class ItemResponse(ItemBase):
     id: str
@@ -36,20 +56,26 @@ class ItemResponse(ItemBase):
         from_attributes = True
 
 
-# In-memory storage (replace with database in production)
-items_db = {}
+class StockAdjustment(BaseModel):
+    id: str
+    quantity_change: int
+    reference: Optional[str] = Field(None, max_length=100)
 
 
-@router.post("/items", response_model=ItemResponse, status_code=status.HTTP_201_CREATED)
-async def create_item(item: ItemCreate):
-    """
-    Create a new item
-    """
-    item_id = str(uuid.uuid4())
+class StockMovement(BaseModel):
+    id: int
+    item_id: str
+    quantity_change: int
+    quantity: int
+    reference: Optional[str] = None
+    created_at: datetime
+
+
+def new_item(item: ItemCreate) -> dict:
+    """Stored record for a newly created item"""
     now = datetime.utcnow()
-    
-    item_data = {
-        "id": item_id,
+    return {
+        "id": str(uuid.uuid4()),
         "name": item.name,
         "description": item.description,
         "price": item.price,
@@ -58,49 +84,173 @@ async def create_item(item: ItemCreate):
         "created_at": now,
         "updated_at": now
     }
+
+
+@router.post("/items", response_model=ItemResponse, status_code=status.HTTP_201_CREATED)
+async def create_item(item: ItemCreate):
+    """
+    Create a new item
+    """
+    item = await storage.items.add(new_item(item))
+    await response_cache.invalidate("items:list")
+    return item
+
+
+@router.post("/items:batch", response_model=BatchResponse)
+async def create_items_batch(request: Request):
+    """
+    Create many items from a JSON array or NDJSON body of ItemCreate rows
+    """
+    rows = await read_rows(request)
+    results = {}
+    records = []
+    for position, (index, item) in enumerate(await validate_rows(rows, ItemCreate, results)):
+        await pause_between_chunks(position)
+        record = new_item(item)
+        records.append(record)
+        results[index] = {"index": index, "status": status.HTTP_201_CREATED, "id": record["id"]}
+    
+    await storage.items.add_many(records)
+    await response_cache.invalidate("items:list")
+    return batch_response(results, len(rows))
+
+
+@router.patch("/items:batch", response_model=BatchResponse)
+async def update_items_batch(request: Request):
+    """
+    Update many items from a JSON array or NDJSON body of ItemUpdate rows with an id
+    """
+    rows = await read_rows(request)
+    results = {}
+    valid = await validate_rows(rows, ItemBatchUpdate, results)
+    now = datetime.utcnow()
+    updates = [
+        (update.id, {**update.model_dump(exclude_unset=True, exclude={"id"}), "updated_at": now})
+        for _, update in valid
+    ]
+    
+    updated = await storage.items.update_many(updates)
+    await response_cache.invalidate("items:records", "items:list")
+    for (index, update), item in zip(valid, updated):
+        if item is None:
+            results[index] = {"index": index, "status": status.HTTP_404_NOT_FOUND, "id": update.id, "error": "Item not found"}
+        else:
+            results[index] = {"index": index, "status": status.HTTP_200_OK, "id": update.id}
+    return batch_response(results, len(rows))
+
+
+@router.delete("/items:batch", response_model=BatchResponse)
+async def delete_items_batch(request: Request):
+    """
+    Delete many items from a JSON array or NDJSON body of item IDs
+    """
+    rows = await read_rows(request)
+    results = {}
+    item_ids = []
+    for index, item_id in enumerate(rows):
+        if isinstance(item_id, str):
+            item_ids.append((index, item_id))
+        else:
+            results[index] = {"index": index, "status": status.HTTP_422_UNPROCESSABLE_ENTITY, "error": "Expected an item ID"}
+    
+    deleted = await storage.items.delete_many([item_id for _, item_id in item_ids])
+    await response_cache.invalidate("items:records", "items:list")
+    for (index, item_id), existed in zip(item_ids, deleted):
+        if existed:
+            results[index] = {"index": index, "status": status.HTTP_204_NO_CONTENT, "id": item_id}
+        else:
+            results[index] = {"index": index, "status": status.HTTP_404_NOT_FOUND, "id": item_id, "error": "Item not found"}
+    return batch_response(results, len(rows))
+
+
+@router.post("/items/stock:batch", response_model=BatchResponse)
+async def adjust_stock_batch(request: Request):
+    """
+    Apply many stock adjustments from a JSON array or NDJSON body of
+    StockAdjustment rows. Each row is applied atomically on its own, in order.
+    """
+    rows = await read_rows(request)
+    results = {}
+    valid = await validate_rows(rows, StockAdjustment, results)
     
-    items_db[item_id] = item_data
-    return item_data
+    adjusted = await storage.items.adjust_stock_many(
+        [(row.id, row.quantity_change, row.reference) for _, row in valid],
+        datetime.utcnow()
+    )
+    await response_cache.invalidate("items:records", "items:list")
+    for (index, row), item in zip(valid, adjusted):
+        if item is None:
+            results[index] = {"index": index, "status": status.HTTP_404_NOT_FOUND, "id": row.id, "error": "Item not found"}
+        elif isinstance(item, InsufficientStockError):
+            results[index] = {"index": index, "status": status.HTTP_400_BAD_REQUEST, "id": row.id, "error": "Insufficient stock"}
+        else:
+            results[index] = {"index": index, "status": status.HTTP_200_OK, "id": row.id}
+    return batch_response(results, len(rows))
 
 
 @router.get("/items", response_model=List[ItemResponse])
+@response_cache.cached(tags=("items:list",))
 async def list_items(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     category: Optional[str] = None,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None
+    max_price: Optional[float] = None,
+    cursor: Optional[str] = Query(None, description="Resume after a previous page (X-Next-Cursor)")
 ):
     """
     List all items with pagination and filters
+
+    Filtered results are sorted by price; unfiltered results are in creation
+    order. When more results follow, the X-Next-Cursor header holds the
+    cursor of the next page.
     """
-    items = list(items_db.values())
-    
-    # Apply filters
-    if category:
-        items = [i for i in items if i.get("category") == category]
-    
-    if min_price is not None:
-        items = [i for i in items if i["price"] >= min_price]
-    
-    if max_price is not None:
-        items = [i for i in items if i["price"] <= max_price]
+    try:
+        items, next_cursor = await storage.items.list(
+            skip, limit, cursor, category, min_price, max_price
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
     
-    return items[skip: skip + limit]
+    # Stored records already match ItemResponse, so they are serialized
+    # directly instead of being re-validated against it
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse(items, headers=headers)
+
+
+@router.get("/items:export")
+async def export_items(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None
+):
+    """
+    Stream every item matching the filters as NDJSON or CSV
+    """
+    pages = storage.items.pages(
+        settings.EXPORT_PAGE_SIZE, category=category, min_price=min_price, max_price=max_price
+    )
+    return export_response(pages, list(ItemResponse.model_fields), format, "items")
 
 
 @router.get("/items/{item_id}", response_model=ItemResponse)
+@response_cache.cached(tags=("item:{item_id}", "items:records"))
 async def get_item(item_id: str):
     """
     Get item by ID
     """
-    if item_id not in items_db:
+    item = await storage.items.get(item_id)
+    if item is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not found"
         )
     
-    return items_db[item_id]
+    return ORJSONResponse(item)
 
 
 @router.put("/items/{item_id}", response_model=ItemResponse)
@@ -108,21 +258,17 @@ async def update_item(item_id: str, item_update: ItemUpdate):
     """
     Update item by ID
     """
-    if item_id not in items_db:
+    update_data = item_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.utcnow()
+    
+    item = await storage.items.update(item_id, update_data)
+    if item is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not found"
         )
     
-    item = items_db[item_id]
-    update_data = item_update.model_dump(exclude_unset=True)
-    
-    for field, value in update_data.items():
-        item[field] = value
-    
-    item["updated_at"] = datetime.utcnow()
-    items_db[item_id] = item
-    
+    await response_cache.invalidate(f"item:{item_id}", "items:list")
     return item
 
 
@@ -131,38 +277,59 @@ async def delete_item(item_id: str):
     """
     Delete item by ID
     """
-    if item_id not in items_db:
+    if not await storage.items.delete(item_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item not found"
         )
     
-    del items_db[item_id]
+    await response_cache.invalidate(f"item:{item_id}", "items:list")
     return None
 
 
 @router.patch("/items/{item_id}/stock", response_model=ItemResponse)
-async def update_stock(item_id: str, quantity_change: int):
+async def update_stock(
+    item_id: str,
+    quantity_change: int,
+    reference: Optional[str] = Query(None, max_length=100)
+):
     """
     Update item stock quantity (increment/decrement)
     """
-    if item_id not in items_db:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Item not found"
+    try:
+        item = await storage.items.adjust_stock(
+            item_id, quantity_change, datetime.utcnow(), reference
         )
-    
-    item = items_db[item_id]
-    new_quantity = item["quantity"] + quantity_change
-    
-    if new_quantity < 0:
+    except InsufficientStockError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Insufficient stock"
         )
     
-    item["quantity"] = new_quantity
-    item["updated_at"] = datetime.utcnow()
-    items_db[item_id] = item
+    if item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Item not found"
+        )
     
+    await response_cache.invalidate(f"item:{item_id}", "items:list")
     return item
+
+
+@router.get("/items/{item_id}/stock/movements", response_model=List[StockMovement])
+async def list_stock_movements(
+    item_id: str,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Stock movements of an item, oldest first; pass the last movement ID as
+    ``after`` to fetch the next page
+    """
+    if await storage.items.get(item_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Item not found"
+        )
+    
+    return ORJSONResponse(await storage.items.stock_movements(item_id, after, limit))
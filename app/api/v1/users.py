@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from datetime import datetime
 import uuid
 
+from app.api.v1.batch import BatchResponse, batch_response, read_rows, validate_rows
+from app.api.v1.export import export_response
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.db import storage
+from app.db.base import ConflictError, pause_between_chunks
+
 router = APIRouter()
 
 
@@ -23,6 +31,18 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     is_active: Optional[bool] = None
 
+    @field_validator("email", "is_active")
+    @classmethod
+    def not_null(cls, value):
+        # Optional only so they can be left out; these fields are required on users
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
+
+class UserBatchUpdate(UserUpdate):
+    id: str
+
 
 class UserResponse(UserBase):
     id: str
@@ -33,8 +53,18 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
-# In-memory storage (replace with database in production)
-users_db = {}
+def new_user(user: UserCreate) -> dict:
+    """Stored record for a newly created user"""
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "email": user.email,
+        "username": user.username,
+        "full_name": user.full_name,
+        "is_active": user.is_active,
+        "created_at": now,
+        "updated_at": now
+    }
 
 
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -42,65 +72,146 @@ async def create_user(user: UserCreate):
     """
     Create a new user
     """
-    # Check if user exists
-    if any(u["email"] == user.email for u in users_db.values()):
+    # The storage backend rejects a taken email or username
+    try:
+        created = await storage.users.add(new_user(user))
+    except ConflictError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=str(exc)
         )
     
-    if any(u["username"] == user.username for u in users_db.values()):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
-        )
+    await response_cache.invalidate("users:list")
+    return created
+
+
+@router.post("/users:batch", response_model=BatchResponse)
+async def create_users_batch(request: Request):
+    """
+    Create many users from a JSON array or NDJSON body of UserCreate rows
+    """
+    rows = await read_rows(request)
+    results = {}
+    valid = await validate_rows(rows, UserCreate, results)
+    records = []
+    for position, (_, user) in enumerate(valid):
+        await pause_between_chunks(position)
+        records.append(new_user(user))
     
-    user_id = str(uuid.uuid4())
+    errors = await storage.users.add_many(records)
+    await response_cache.invalidate("users:list")
+    for (index, _), record, error in zip(valid, records, errors):
+        if error is None:
+            results[index] = {"index": index, "status": status.HTTP_201_CREATED, "id": record["id"]}
+        else:
+            results[index] = {"index": index, "status": status.HTTP_400_BAD_REQUEST, "error": str(error)}
+    return batch_response(results, len(rows))
+
+
+@router.patch("/users:batch", response_model=BatchResponse)
+async def update_users_batch(request: Request):
+    """
+    Update many users from a JSON array or NDJSON body of UserUpdate rows with an id
+    """
+    rows = await read_rows(request)
+    results = {}
+    valid = await validate_rows(rows, UserBatchUpdate, results)
     now = datetime.utcnow()
+    updates = [
+        (update.id, {**update.model_dump(exclude_unset=True, exclude={"id"}), "updated_at": now})
+        for _, update in valid
+    ]
     
-    user_data = {
-        "id": user_id,
-        "email": user.email,
-        "username": user.username,
-        "full_name": user.full_name,
-        "is_active": user.is_active,
-        "created_at": now,
-        "updated_at": now
-    }
+    updated = await storage.users.update_many(updates)
+    await response_cache.invalidate("users:records", "users:list")
+    for (index, update), user in zip(valid, updated):
+        if user is None:
+            results[index] = {"index": index, "status": status.HTTP_404_NOT_FOUND, "id": update.id, "error": "User not found"}
+        elif isinstance(user, ConflictError):
+            results[index] = {"index": index, "status": status.HTTP_400_BAD_REQUEST, "id": update.id, "error": str(user)}
+        else:
+            results[index] = {"index": index, "status": status.HTTP_200_OK, "id": update.id}
+    return batch_response(results, len(rows))
+
+
+@router.delete("/users:batch", response_model=BatchResponse)
+async def delete_users_batch(request: Request):
+    """
+    Delete many users from a JSON array or NDJSON body of user IDs
+    """
+    rows = await read_rows(request)
+    results = {}
+    user_ids = []
+    for index, user_id in enumerate(rows):
+        if isinstance(user_id, str):
+            user_ids.append((index, user_id))
+        else:
+            results[index] = {"index": index, "status": status.HTTP_422_UNPROCESSABLE_ENTITY, "error": "Expected a user ID"}
     
-    users_db[user_id] = user_data
-    return user_data
+    deleted = await storage.users.delete_many([user_id for _, user_id in user_ids])
+    await response_cache.invalidate("users:records", "users:list")
+    for (index, user_id), existed in zip(user_ids, deleted):
+        if existed:
+            results[index] = {"index": index, "status": status.HTTP_204_NO_CONTENT, "id": user_id}
+        else:
+            results[index] = {"index": index, "status": status.HTTP_404_NOT_FOUND, "id": user_id, "error": "User not found"}
+    return batch_response(results, len(rows))
 
 
 @router.get("/users", response_model=List[UserResponse])
+@response_cache.cached(tags=("users:list",))
 async def list_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    is_active: Optional[bool] = None
+    is_active: Optional[bool] = None,
+    cursor: Optional[str] = Query(None, description="Resume after a previous page (X-Next-Cursor)")
 ):
     """
     List all users with pagination
+
+    Results are in creation order. When more results follow, the
+    X-Next-Cursor header holds the cursor of the next page.
     """
-    users = list(users_db.values())
-    
-    if is_active is not None:
-        users = [u for u in users if u["is_active"] == is_active]
+    try:
+        users, next_cursor = await storage.users.list(skip, limit, cursor, is_active)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
     
-    return users[skip: skip + limit]
+    # Stored records already match UserResponse, so they are serialized
+    # directly instead of being re-validated against it
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse(users, headers=headers)
+
+
+@router.get("/users:export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    is_active: Optional[bool] = None
+):
+    """
+    Stream every user matching the filters as NDJSON or CSV
+    """
+    pages = storage.users.pages(settings.EXPORT_PAGE_SIZE, is_active=is_active)
+    return export_response(pages, list(UserResponse.model_fields), format, "users")
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
+@response_cache.cached(tags=("user:{user_id}", "users:records"))
 async def get_user(user_id: str):
     """
     Get user by ID
     """
-    if user_id not in users_db:
+    user = await storage.users.get(user_id)
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    return users_db[user_id]
+    return ORJSONResponse(user)
 
 
 @router.put("/users/{user_id}", response_model=UserResponse)
@@ -108,21 +219,24 @@ async def update_user(user_id: str, user_update: UserUpdate):
     """
     Update user by ID
     """
-    if user_id not in users_db:
+    update_data = user_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.utcnow()
+    
+    try:
+        user = await storage.users.update(user_id, update_data)
+    except ConflictError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user = users_db[user_id]
-    update_data = user_update.model_dump(exclude_unset=True)
-    
-    for field, value in update_data.items():
-        user[field] = value
-    
-    user["updated_at"] = datetime.utcnow()
-    users_db[user_id] = user
-    
+    await response_cache.invalidate(f"user:{user_id}", "users:list")
     return user
 
 
@@ -131,11 +245,11 @@ async def delete_user(user_id: str):
     """
     Delete user by ID
     """
-    if user_id not in users_db:
+    if not await storage.users.delete(user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    del users_db[user_id]
+    await response_cache.invalidate(f"user:{user_id}", "users:list")
     return None
@@ -0,0 +1,202 @@
+"""Server-side alarm evaluation over the fleet's sensor channels"""
+from collections import deque
+from itertools import groupby, islice
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.fleet import CHANNEL_ROWS, CHANNELS
+
+
+class AlarmRule:
+    """
+    Raises when a channel goes above ``raise_at`` (below it, for
+    ``direction="low"``) and clears only once it is back past
+    ``clear_at``, so a value hovering at the limit does not flap.
+
+    Threshold rules compare the channel value; rate rules compare its
+    rate of change per second.
+    """
+
+    KINDS = ("threshold", "rate")
+    DIRECTIONS = ("high", "low")
+
+    def __init__(
+        self,
+        name: str,
+        channel: str,
+        raise_at: float,
+        clear_at: float,
+        kind: str = "threshold",
+        direction: str = "high",
+        severity: str = "warning",
+        message: str = ""
+    ):
+        if channel not in CHANNEL_ROWS:
+            raise ValueError(f"Unknown channel {channel!r}, expected one of: {', '.join(CHANNELS)}")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown rule kind {kind!r}")
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"Unknown direction {direction!r}")
+        if (clear_at > raise_at) if direction == "high" else (clear_at < raise_at):
+            raise ValueError(f"Rule {name!r} would clear before it raises")
+        self.name = name
+        self.channel = channel
+        self.raise_at = raise_at
+        self.clear_at = clear_at
+        self.kind = kind
+        self.direction = direction
+        self.severity = severity
+        self.message = message or name
+
+    def describe(self) -> Dict:
+        return {
+            "name": self.name,
+            "channel": self.channel,
+            "kind": self.kind,
+            "direction": self.direction,
+            "raise_at": self.raise_at,
+            "clear_at": self.clear_at,
+            "severity": self.severity,
+            "message": self.message,
+        }
+
+
+# The limits the dashboard used to check in the browser, with a deadband
+DEFAULT_RULES = (
+    AlarmRule("temperature_high", "temperature", 85.5, 81.0, severity="critical",
+              message="Temperature above 90% of maximum"),
+    AlarmRule("pressure_high", "pressure", 5.85, 5.5, severity="critical",
+              message="Pressure above 90% of maximum"),
+    AlarmRule("vibration_high", "vibration", 2.55, 2.3, severity="critical",
+              message="Vibration above 85% of maximum"),
+)
+
+
+class AlarmEngine:
+    """
+    Evaluates every rule against every machine in one vectorized pass
+    per tick.
+
+    Rules are grouped by the signal they watch (channel, threshold or
+    rate, direction), and each group is compared against its limits in a
+    single broadcast operation into a rules x machines state array. Low
+    rules watch the negated signal, so one comparison covers both
+    directions. Only state changes become events; they update the
+    active-alarm table and are appended to a log bounded to
+    ``log_capacity`` events.
+    """
+
+    def __init__(self, rules: Sequence[AlarmRule], machine_ids: Sequence[str], log_capacity: int):
+        def source(rule: AlarmRule) -> Tuple[int, bool, float]:
+            return CHANNEL_ROWS[rule.channel], rule.kind == "rate", 1.0 if rule.direction == "high" else -1.0
+
+        # Rules of a group are contiguous, so each group's slice of the
+        # state arrays is a view that can be written in place
+        self.rules = sorted(rules, key=source)
+        self.machine_ids = list(machine_ids)
+        self._groups: List[Tuple[int, bool, float, slice]] = []
+        for key, group in groupby(enumerate(self.rules), key=lambda pair: source(pair[1])):
+            indices = [index for index, _ in group]
+            self._groups.append((*key, slice(indices[0], indices[-1] + 1)))
+        self._watches_rate = any(rate for _, rate, _, _ in self._groups)
+
+        shape = (len(self.rules), len(self.machine_ids))
+        signs = np.array([1.0 if rule.direction == "high" else -1.0 for rule in self.rules])
+        self._signs = signs
+        self._raise_at = (np.array([rule.raise_at for rule in self.rules]) * signs).reshape(-1, 1)
+        self._clear_at = (np.array([rule.clear_at for rule in self.rules]) * signs).reshape(-1, 1)
+        self._raised = np.zeros(shape, dtype=bool)
+        self._held = np.zeros(shape, dtype=bool)
+        self.state = np.zeros(shape, dtype=bool)
+        self._signal = np.zeros((len(self._groups), len(self.machine_ids)))
+        self._rule_group = np.repeat(
+            np.arange(len(self._groups)), [group.stop - group.start for *_, group in self._groups]
+        )
+        self._previous: Optional[np.ndarray] = None
+        self._previous_time = 0.0
+
+        self.active: Dict[Tuple[int, int], Dict] = {}
+        self.events: Deque[Dict] = deque(maxlen=log_capacity)
+        self.sequence = 0
+        self._listeners: List[Callable[[List[Dict]], None]] = []
+
+    def add_listener(self, listener: Callable[[List[Dict]], None]) -> None:
+        """Call ``listener`` with the events of every tick that changes an alarm"""
+        self._listeners.append(listener)
+
+    def evaluate(self, now: float, values: np.ndarray) -> List[Dict]:
+        """Check a channels x machines sample, returning the raise and clear events"""
+        rates = None
+        if self._watches_rate:
+            if self._previous is not None and now > self._previous_time:
+                rates = (values - self._previous) / (now - self._previous_time)
+            self._previous = values.copy()
+            self._previous_time = now
+
+        for g, (row, rate, sign, rules) in enumerate(self._groups):
+            signal = self._signal[g]
+            if not rate:
+                np.multiply(values[row], sign, out=signal)
+            elif rates is not None:
+                np.multiply(rates[row], sign, out=signal)
+            else:
+                signal.fill(0.0)
+            np.greater(signal, self._raise_at[rules], out=self._raised[rules])
+            np.greater_equal(signal, self._clear_at[rules], out=self._held[rules])
+
+        # An alarm is on if it crosses its raise limit, or was already on
+        # and has not dropped past its clear limit. The result is built in
+        # the scratch array, which then swaps roles with the old state.
+        state = np.logical_or(
+            self._raised, np.logical_and(self.state, self._held, out=self._held), out=self._raised
+        )
+        changed = np.flatnonzero(np.not_equal(state, self.state, out=self._held))
+        self._raised, self.state = self.state, state
+        if not len(changed):
+            return []
+
+        changed_rules, changed_machines = np.divmod(changed, len(self.machine_ids))
+        measured = self._signal[self._rule_group[changed_rules], changed_machines] * self._signs[changed_rules]
+        events = []
+        for r, m, value in zip(changed_rules.tolist(), changed_machines.tolist(), measured.tolist()):
+            rule = self.rules[r]
+            raised = bool(state[r, m])
+            self.sequence += 1
+            event = {
+                "id": self.sequence,
+                "type": "raised" if raised else "cleared",
+                "rule": rule.name,
+                "machine": self.machine_ids[m],
+                "channel": rule.channel,
+                "severity": rule.severity,
+                "message": rule.message,
+                "value": value,
+                "timestamp": now,
+            }
+            if raised:
+                self.active[(r, m)] = event
+            else:
+                self.active.pop((r, m), None)
+            events.append(event)
+
+        self.events.extend(events)
+        for listener in self._listeners:
+            listener(events)
+        return events
+
+    def active_alarms(self, machine: Optional[str] = None, severity: Optional[str] = None) -> List[Dict]:
+        """Raise events of the alarms currently active, oldest first"""
+        return [
+            event for event in self.active.values()
+            if (machine is None or event["machine"] == machine)
+            and (severity is None or event["severity"] == severity)
+        ]
+
+    def events_after(self, after: Optional[int], limit: int) -> List[Dict]:
+        """Logged events with an ID above ``after``, oldest first"""
+        if not self.events:
+            return []
+        # Event IDs are consecutive, so the position of ``after`` is known
+        offset = 0 if after is None else max(0, after - self.events[0]["id"] + 1)
+        return list(islice(self.events, offset, offset + limit))
@@ -0,0 +1,98 @@
+"""
+Dashboard assets served from memory, content-hashed and precompressed.
+
+Stylesheets and scripts are published under names carrying a hash of
+their content, so they can be cached for a year and a deploy that
+changes them also changes their URLs. The page itself keeps its URL and
+is revalidated with its ETag on every visit.
+"""
+from pathlib import Path
+from typing import Dict, Optional
+import gzip
+import hashlib
+import mimetypes
+
+from starlette.requests import HTTPConnection, Request
+from starlette.responses import Response
+
+from app.core.http import etag_matches, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # gzip variants are still served
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Files referenced from index.html as {{ name }} placeholders
+HASHED_SUFFIXES = (".css", ".js")
+
+
+class Asset:
+    """One file with its identity, gzip and (if available) brotli encodings"""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for coding, variant in compressed.items():
+            if len(variant) < len(body):
+                self.variants[coding] = variant
+
+    def response(self, request: HTTPConnection, head: bool = False) -> Response:
+        coding = negotiate_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        etag = f'"{self.digest}"' if coding == "identity" else f'"{self.digest}-{coding}"'
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        body = self.variants[coding]
+        response = Response(b"" if head else body, media_type=self.media_type, headers=headers)
+        response.headers["Content-Length"] = str(len(body))
+        return response
+
+
+class AssetStore:
+    """
+    ASGI app serving the hashed assets of a directory, meant to be
+    mounted at ``prefix``; ``index`` is the page that links them.
+    """
+
+    def __init__(self, directory: Path, prefix: str, index: str = "index.html"):
+        self.assets: Dict[str, Asset] = {}
+        self.urls: Dict[str, str] = {}
+        for path in sorted(directory.iterdir()):
+            if path.suffix not in HASHED_SUFFIXES:
+                continue
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            asset = Asset(path.read_bytes(), media_type, IMMUTABLE)
+            hashed = f"{path.stem}.{asset.digest}{path.suffix}"
+            self.assets[hashed] = asset
+            self.urls[path.name] = f"{prefix}/{hashed}"
+
+        page = (directory / index).read_text()
+        for name, url in self.urls.items():
+            page = page.replace("{{ " + name + " }}", url)
+        self.index = Asset(page.encode(), "text/html", REVALIDATE)
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name)
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        asset = self.get(scope["path"].rsplit("/", 1)[-1])
+        if request.method not in ("GET", "HEAD"):
+            response = Response(status_code=405, headers={"Allow": "GET, HEAD"})
+        elif asset is None:
+            response = Response("Not Found", status_code=404, media_type="text/plain")
+        else:
+            response = asset.response(request, head=request.method == "HEAD")
+        await response(scope, receive, send)
+
@@ -0,0 +1,39 @@
+"""Fan-out of pre-serialized messages to stream subscribers"""
+import asyncio
+from typing import Optional, Set
+
+
+class Broadcaster:
+    """
+    Single-producer, multi-consumer message fan-out.
+
+    Each subscriber owns a one-slot queue. Publishing replaces any message a
+    subscriber has not consumed yet, so slow clients always get the latest
+    state instead of an ever-growing backlog.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.latest: Optional[str] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, message: str) -> None:
+        """Deliver an already-serialized message to every subscriber"""
+        self.latest = message
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
@@ -0,0 +1,302 @@
+"""Tag-invalidated response cache for read endpoints"""
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import inspect
+import time
+import zlib
+
+import orjson
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.http import etag_matches
+
+try:
+    from redis import asyncio as redis
+    from redis.exceptions import RedisError
+except ImportError:  # only the in-process tier is available
+    redis = None
+    RedisError = OSError
+
+# Status, media type, headers and body of a cached response
+Entry = Tuple[int, Optional[str], List[Tuple[str, str]], bytes]
+
+# Set by Starlette from the body and media type when the response is rebuilt
+_DERIVED_HEADERS = ("content-length", "content-type")
+# Keyword the cached wrapper receives the request under
+_REQUEST_PARAMETER = "_cache_request"
+# Kept on a 304, so the client's copy stays valid
+_VALIDATOR_HEADERS = ("etag", "cache-control", "vary")
+
+
+def _entry(response: Response) -> Entry:
+    headers = [
+        (name.decode("latin-1"), value.decode("latin-1"))
+        for name, value in response.raw_headers
+        if name.decode("latin-1") not in _DERIVED_HEADERS
+    ]
+    # Tagged by content, so compressed copies are cached per entry as well
+    if "etag" not in response.headers:
+        headers.append(("etag", f'"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'))
+    return response.status_code, response.media_type, headers, response.body
+
+
+def _response(entry: Entry, request: Optional[Request] = None) -> Response:
+    status_code, media_type, headers, body = entry
+    etag = next((value for name, value in headers if name == "etag"), None)
+    if request is not None and etag is not None and etag_matches(request, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={name: value for name, value in headers if name in _VALIDATOR_HEADERS}
+        )
+    response = Response(body, status_code=status_code, media_type=media_type)
+    for name, value in headers:
+        response.headers.append(name, value)
+    return response
+
+
+class ResponseCache:
+    """
+    Encoded responses cached by endpoint and arguments, in a bounded
+    LRU tier with a TTL in each process and, optionally, a Redis tier
+    shared by every worker.
+
+    Entries carry tags. Invalidating a tag bumps its generation, and an
+    entry stored under an older generation of any of its tags is a miss,
+    so invalidation costs one counter update per tag however many entries
+    it affects. Tags are hashed into ``tag_slots`` generation counters,
+    which keeps the table bounded however many IDs are tagged; tags that
+    share a slot only cause the odd extra miss.
+
+    With Redis, generations are also kept in a Redis hash that every worker
+    checks, including before serving an in-process hit, so an invalidation
+    in one worker reaches all of them at once. If Redis is unreachable,
+    in-process hits are served unchecked until they expire.
+
+    Pass ``redis_client`` to use an existing client, e.g. a fake in tests.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        redis_url: Optional[str] = None,
+        redis_client=None,
+        prefix: str = "response-cache:",
+        tag_slots: int = 4096
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        self.tag_slots = tag_slots
+        # Per key: expiry, local and shared generations it was stored under, entry
+        self._entries: "OrderedDict[str, Tuple[float, Dict[int, int], Optional[Dict[str, int]], Entry]]" = OrderedDict()
+        self._generations = [0] * tag_slots
+        if redis_client is None and redis_url and redis is not None:
+            redis_client = redis.from_url(redis_url)
+        self.redis = redis_client
+        self._tags_key = f"{prefix}tags"
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.redis is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _slots(self, tags: Iterable[str]) -> List[int]:
+        return sorted({zlib.crc32(tag.encode()) % self.tag_slots for tag in tags})
+
+    def _local_get(self, key: str) -> Optional[Tuple[Entry, Optional[Dict[str, int]]]]:
+        """An unexpired, locally current entry and the shared generations it was stored under"""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        expires_at, generations, shared, entry = cached
+        if expires_at < time.monotonic() or any(
+            self._generations[slot] != generation for slot, generation in generations.items()
+        ):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry, shared
+
+    def _local_set(
+        self,
+        key: str,
+        entry: Entry,
+        generations: Dict[int, int],
+        shared: Optional[Dict[str, int]],
+        ttl: float
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, generations, shared, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _redis_generations(self, slots: Sequence[int]) -> Optional[Dict[str, int]]:
+        """Current shared generations of ``slots``, or None if Redis is unavailable"""
+        if not slots:
+            return {}
+        try:
+            generations = await self.redis.hmget(self._tags_key, [str(slot) for slot in slots])
+        except (RedisError, OSError):
+            metrics.cache_lookups.inc(("redis", "error"))
+            return None
+        return {str(slot): int(generation or 0) for slot, generation in zip(slots, generations)}
+
+    async def _redis_get(self, key: str, slots: Sequence[int]) -> Tuple[Optional[Entry], Optional[Dict[str, int]]]:
+        """
+        The Redis entry for ``key`` if it is current, plus the current
+        shared generations of ``slots`` (None if Redis is unavailable)
+        """
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(self.prefix + key)
+                if slots:
+                    pipe.hmget(self._tags_key, [str(slot) for slot in slots])
+                results = await pipe.execute()
+        except (RedisError, OSError):
+            metrics.cache_lookups.inc(("redis", "error"))
+            return None, None
+        current = {
+            str(slot): int(generation or 0)
+            for slot, generation in zip(slots, results[1] if slots else ())
+        }
+        if results[0] is None:
+            return None, current
+        head, _, body = results[0].partition(b"\n")
+        status_code, media_type, headers, generations = orjson.loads(head)
+        if generations != current:
+            return None, current
+        return (status_code, media_type, [tuple(pair) for pair in headers], body), current
+
+    async def _redis_set(self, key: str, entry: Entry, generations: Dict[str, int], ttl: float) -> None:
+        status_code, media_type, headers, body = entry
+        value = orjson.dumps([status_code, media_type, headers, generations]) + b"\n" + body
+        try:
+            await self.redis.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+        except (RedisError, OSError):
+            metrics.cache_lookups.inc(("redis", "error"))
+
+    async def invalidate(self, *tags: str) -> None:
+        """Expire every entry carrying any of ``tags``, in every worker"""
+        slots = self._slots(tags)
+        for slot in slots:
+            self._generations[slot] += 1
+        if self.redis is None or not slots:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for slot in slots:
+                    pipe.hincrby(self._tags_key, str(slot), 1)
+                await pipe.execute()
+        except (RedisError, OSError):
+            metrics.cache_lookups.inc(("redis", "error"))
+
+    def clear(self) -> None:
+        """Drop every in-process entry"""
+        self._entries.clear()
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    def cached(self, tags: Sequence[str] = (), ttl: Optional[float] = None):
+        """
+        Cache the responses of an endpoint by its arguments.
+
+        ``tags`` are formatted with the endpoint's arguments, e.g.
+        ``"item:{item_id}"``. Successful responses are cached; errors are
+        not. The endpoint must return a Response, or data to be encoded as
+        JSON without a response model.
+
+        Cached responses carry an ETag of their content, and a request
+        whose If-None-Match matches it gets a 304 without the body.
+        """
+        ttl = self.ttl if ttl is None else ttl
+
+        def decorate(endpoint):
+            name = f"{endpoint.__module__}.{endpoint.__qualname__}"
+
+            @wraps(endpoint)
+            async def wrapper(**kwargs):
+                request = kwargs.pop(_REQUEST_PARAMETER, None)
+                if not self.enabled:
+                    return await endpoint(**kwargs)
+                key = name + ":" + orjson.dumps(kwargs, option=orjson.OPT_SORT_KEYS).decode()
+                slots = self._slots(tag.format(**kwargs) for tag in tags)
+                # Generations are read before the response is computed, so
+                # an invalidation meanwhile makes the new entry stale at once
+                generations = {slot: self._generations[slot] for slot in slots}
+
+                cached = self._local_get(key)
+                if cached is not None:
+                    entry, stored = cached
+                    # Another worker may have invalidated it through Redis
+                    current = None
+                    if self.redis is not None and stored is not None:
+                        current = await self._redis_generations(slots)
+                    if current is None or current == stored:
+                        metrics.cache_lookups.inc(("local", "hit"))
+                        return _response(entry, request)
+                    self._entries.pop(key, None)
+                metrics.cache_lookups.inc(("local", "miss"))
+
+                shared = None
+                if self.redis is not None:
+                    entry, shared = await self._redis_get(key, slots)
+                    if entry is not None:
+                        metrics.cache_lookups.inc(("redis", "hit"))
+                        self._local_set(key, entry, generations, shared, ttl)
+                        return _response(entry, request)
+                    if shared is not None:
+                        metrics.cache_lookups.inc(("redis", "miss"))
+
+                response = await endpoint(**kwargs)
+                if not isinstance(response, Response):
+                    response = Response(orjson.dumps(response), media_type="application/json")
+                if response.status_code != 200 or not hasattr(response, "body"):
+                    return response
+                entry = _entry(response)
+                self._local_set(key, entry, generations, shared, ttl)
+                if shared is not None:
+                    await self._redis_set(key, entry, shared, ttl)
+                return _response(entry, request)
+
+            # FastAPI passes the request in as well, for If-None-Match
+            signature = inspect.signature(endpoint)
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(_REQUEST_PARAMETER, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+            return wrapper
+
+        return decorate
+
+
+def _local_entries() -> int:
+    """
+    RESPONSE_CACHE_SIZE, or by default none when the workers share a
+    database but no Redis tier: a write in one worker could not reach the
+    others' entries, which would serve stale reads until they expire
+    """
+    if settings.RESPONSE_CACHE_SIZE is not None:
+        return settings.RESPONSE_CACHE_SIZE
+    shared_storage = not settings.DATABASE_URL.startswith("memory://")
+    return 0 if shared_storage and not settings.RESPONSE_CACHE_REDIS else 1024
+
+
+response_cache = ResponseCache(
+    _local_entries(),
+    settings.RESPONSE_CACHE_TTL_SECONDS,
+    settings.REDIS_URL if settings.RESPONSE_CACHE_REDIS else None,
+    tag_slots=settings.RESPONSE_CACHE_TAG_SLOTS
+)
@@ -0,0 +1,160 @@
+"""Fixed-size log of machine control commands, shareable between processes"""
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, ContextManager, Dict, Optional, Sequence, Tuple
+import time
+import uuid
+
+import numpy as np
+
+ACTIONS = ("start", "stop", "reset")
+
+# Index 0 marks an empty slot
+STATUSES = ("", "queued", "applied", "failed")
+_QUEUED, _APPLIED, _FAILED = 1, 2, 3
+
+# Longest Idempotency-Key accepted, in characters
+MAX_KEY_LENGTH = 255
+MAX_ERROR_BYTES = 200
+
+# One command per record; wider fields first, as in fleet.STATE_FIELDS
+RECORD_DTYPE = np.dtype([
+    ("submitted_at", np.float64),
+    ("completed_at", np.float64),
+    ("version", np.int64),
+    ("machine", np.uint32),
+    ("action", np.uint8),
+    ("status", np.uint8),
+    ("keyed", np.bool_),
+    ("id", f"S{len(uuid.uuid4().hex)}"),
+    ("idempotency_key", f"S{MAX_KEY_LENGTH}"),
+    ("error", f"S{MAX_ERROR_BYTES}"),
+])
+
+# The number of commands ever logged, then the records
+_COUNT_BYTES = 8
+
+
+class IdempotencyConflictError(ValueError):
+    """An idempotency key was reused for a different command"""
+
+
+def log_nbytes(capacity: int) -> int:
+    """Bytes needed to hold a log of ``capacity`` commands, rounded up to whole words"""
+    return (_COUNT_BYTES + RECORD_DTYPE.itemsize * capacity + 7) // 8 * 8
+
+
+class CommandLog:
+    """
+    The last ``capacity`` control commands in a ring of fixed-size
+    records, found by ID or by idempotency key.
+
+    Pass ``buffer`` (``log_nbytes(capacity)`` bytes) and ``lock`` to keep
+    the log in memory shared by several processes; every access then runs
+    under the lock, so claiming a key is atomic across all of them.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        capacity: int,
+        buffer=None,
+        lock: Optional[Callable[[], ContextManager]] = None
+    ):
+        self.ids = list(ids)
+        self.capacity = capacity
+        if buffer is None:
+            buffer = bytearray(log_nbytes(capacity))
+        self._count = np.ndarray((1,), dtype=np.uint64, buffer=buffer)
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=buffer, offset=_COUNT_BYTES)
+        self._lock = lock or nullcontext
+
+    def _find(self, field: str, value: bytes) -> Optional[int]:
+        records = self.records
+        found = (records["status"] != 0) & (records[field] == value)
+        if field == "idempotency_key":
+            found &= records["keyed"]
+        matches = np.flatnonzero(found)
+        return int(matches[0]) if matches.size else None
+
+    def _find_key(self, key: bytes, action: str, machine: int) -> Optional[Dict]:
+        slot = self._find("idempotency_key", key)
+        if slot is None:
+            return None
+        record = self.records[slot]
+        if (ACTIONS[record["action"]], int(record["machine"])) != (action, machine):
+            raise IdempotencyConflictError(
+                "Idempotency-Key was already used for a different command"
+            )
+        return self._describe(record)
+
+    def find(self, action: str, machine: int, idempotency_key: str) -> Optional[Dict]:
+        """
+        The command logged under ``idempotency_key``, or None. Raises
+        IdempotencyConflictError if it is not ``action`` on ``machine``.
+        """
+        with self._lock():
+            return self._find_key(idempotency_key.encode("latin-1"), action, machine)
+
+    def claim(
+        self, action: str, machine: int, idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict, int, bool]:
+        """
+        Log a new queued command, unless ``idempotency_key`` already
+        belongs to one. Returns the command, its slot and whether it is
+        the earlier command with that key.
+        """
+        key = b"" if idempotency_key is None else idempotency_key.encode("latin-1")
+        with self._lock():
+            if idempotency_key is not None:
+                command = self._find_key(key, action, machine)
+                if command is not None:
+                    return command, -1, True
+            slot = int(self._count[0] % self.capacity)
+            self.records[slot] = (
+                time.time(), 0.0, -1, machine, ACTIONS.index(action), _QUEUED,
+                idempotency_key is not None, uuid.uuid4().hex.encode(), key, b""
+            )
+            self._count[0] += 1
+            return self._describe(self.records[slot]), slot, False
+
+    def complete(self, slot: int, command_id: str, version: int, error: Optional[str] = None) -> Optional[Dict]:
+        """
+        Record the outcome of a command, returning it, or None if its slot
+        was reused for a newer command meanwhile
+        """
+        with self._lock():
+            record = self.records[slot]
+            if record["id"] != command_id.encode():
+                return None
+            record["completed_at"] = time.time()
+            record["version"] = version
+            record["status"] = _APPLIED if error is None else _FAILED
+            record["error"] = (error or "").encode()[:MAX_ERROR_BYTES]
+            return self._describe(record)
+
+    def get(self, command_id: str) -> Optional[Dict]:
+        """A logged command by ID, or None"""
+        if not command_id.isascii():
+            return None
+        with self._lock():
+            slot = self._find("id", command_id.encode())
+            return None if slot is None else self._describe(self.records[slot])
+
+    def _describe(self, record) -> Dict:
+        status = STATUSES[record["status"]]
+        return {
+            "id": record["id"].decode(),
+            "action": ACTIONS[record["action"]],
+            "machine": self.ids[record["machine"]],
+            "status": status,
+            "idempotency_key": record["idempotency_key"].decode("latin-1") if record["keyed"] else None,
+            "submitted_at": _timestamp(record["submitted_at"]),
+            "completed_at": None if status == "queued" else _timestamp(record["completed_at"]),
+            "version": None if status == "queued" else int(record["version"]),
+            "error": record["error"].decode(errors="replace") or None,
+        }
+
+
+def _timestamp(seconds: float) -> str:
+    return datetime.utcfromtimestamp(seconds).isoformat()
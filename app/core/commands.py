@@ -0,0 +1,122 @@
+"""Ordered, idempotent machine control commands"""
+from contextlib import suppress
+from typing import Dict, Optional, Tuple
+import asyncio
+
+from app.core import metrics
+from app.core.command_log import ACTIONS, CommandLog, IdempotencyConflictError
+from app.core.simulation import MachineSimulator
+
+
+class CommandQueueFullError(RuntimeError):
+    """Too many commands are waiting to be applied"""
+
+
+class CommandQueue:
+    """
+    Control commands applied one at a time, in submission order, by a
+    single consumer task, so concurrent commands never interleave.
+
+    Commands are recorded in ``log``. A command submitted with an
+    idempotency key that the log already holds is not queued again; the
+    original command is returned instead, so retries and double-clicks
+    apply once. With a log in shared memory this holds across workers, and
+    a worker waiting on another worker's command polls the log every
+    ``poll_seconds``.
+    """
+
+    def __init__(
+        self, simulator: MachineSimulator, queue_size: int, log: CommandLog, poll_seconds: float = 0.1
+    ):
+        self.simulator = simulator
+        self.queue_size = queue_size
+        self.log = log
+        self.poll_seconds = poll_seconds
+        # Created per event loop, as an asyncio.Queue only works in one
+        self.queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._done: Dict[str, asyncio.Future] = {}
+
+    def _queue(self) -> asyncio.Queue:
+        """The queue for the running event loop, created on first use in it"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self._done = {}
+        return self.queue
+
+    def submit(
+        self, action: str, index: int, idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Queue a command for machine ``index``, returning its record and
+        whether it is a replay of an earlier command with the same key.
+
+        Raises IdempotencyConflictError if the key belongs to a different
+        command, and CommandQueueFullError if the queue is full.
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action {action!r}")
+        queue = self._queue()
+        if queue.full():
+            # Replays need no room in the queue
+            command = None
+            if idempotency_key is not None:
+                command = self.log.find(action, index, idempotency_key)
+            if command is None:
+                raise CommandQueueFullError("Too many commands are waiting to be applied")
+            return command, True
+
+        command, slot, replayed = self.log.claim(action, index, idempotency_key)
+        if not replayed:
+            queue.put_nowait((command, slot, index))
+            self._done[command["id"]] = self._loop.create_future()
+        return command, replayed
+
+    async def wait(self, command: Dict, timeout: float) -> Dict:
+        """Wait up to ``timeout`` seconds for a command to be applied, returning its record"""
+        done = self._done.get(command["id"])
+        if done is not None:
+            with suppress(asyncio.TimeoutError):
+                return await asyncio.wait_for(asyncio.shield(done), timeout)
+            return command
+        # Queued by another worker, or already applied
+        deadline = asyncio.get_running_loop().time() + timeout
+        while command["status"] == "queued":
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(self.poll_seconds, remaining))
+            command = self.log.get(command["id"]) or command
+        return command
+
+    def get(self, command_id: str) -> Optional[Dict]:
+        """Record of a recent command, or None"""
+        return self.log.get(command_id)
+
+    async def run(self) -> None:
+        """Apply queued commands forever, in order"""
+        queue = self._queue()
+        try:
+            while True:
+                command, slot, index = await queue.get()
+                error = None
+                try:
+                    getattr(self.simulator, command["action"])(index)
+                except Exception as exc:
+                    error = str(exc)
+                self._finish(command, slot, error)
+        finally:
+            # Commands left over are never applied; say so rather than
+            # leaving them queued for good
+            while not queue.empty():
+                command, slot, _ = queue.get_nowait()
+                self._finish(command, slot, "Server stopped before the command was applied")
+
+    def _finish(self, command: Dict, slot: int, error: Optional[str]) -> None:
+        command = self.log.complete(slot, command["id"], self.simulator.version, error) or command
+        metrics.commands_total.inc((command["action"], "applied" if error is None else "failed"))
+        done = self._done.pop(command["id"], None)
+        if done is not None and not done.done():
+            done.set_result(command)
@@ -0,0 +1,169 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Small bodies are sent as is. Complete bodies are compressed in one pass,
+and bodies tagged with an ETag are compressed once per version and
+reused from a bounded cache, since every client polling the same version
+would get the same bytes. Streamed bodies are compressed chunk by chunk
+and flushed, so streaming still reaches the client incrementally.
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+import gzip
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.http import negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/javascript", "application/xml"
+)
+
+
+def _compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type.endswith("+json")
+        or media_type in COMPRESSIBLE_TYPES
+    )
+
+
+class _StreamCompressor:
+    """Incremental compressor that flushes after every chunk"""
+
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        if coding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def process(self, chunk: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(chunk) + self._brotli.finish()
+        return self._zlib.compress(chunk) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing compressible responses of at least
+    ``minimum_size`` bytes with brotli or gzip.
+
+    Responses that already carry a Content-Encoding are left alone. A
+    strong ETag is weakened on compressed responses, as the bytes differ
+    from the identity representation; If-None-Match still matches it.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache_size: int = 256
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.codings = ("br", "gzip") if brotli is not None else ("gzip",)
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+
+    def compress(self, coding: str, body: bytes) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def compress_cached(self, key: Optional[Tuple], coding: str, body: bytes) -> bytes:
+        """Compress ``body``, reusing the result for a versioned ``key``"""
+        if key is None:
+            return self.compress(coding, body)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = self.cache[key] = self.compress(coding, body)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return compressed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        coding = negotiate_encoding(accept_encoding, self.codings)
+        if coding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        compressor: Optional[_StreamCompressor] = None
+
+        def encoded_start(length: Optional[int]) -> dict:
+            headers = MutableHeaders(raw=list(start["headers"]))
+            headers["Content-Encoding"] = coding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if length is None:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(length)
+            return {**start, "headers": headers.raw}
+
+        async def send_compressed(message):
+            nonlocal start, passthrough, compressor
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not _compressible(headers.get("content-type", "")):
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body:
+                    if len(body) < self.minimum_size:
+                        await send(start)
+                        await send(message)
+                        return
+                    etag = Headers(raw=start["headers"]).get("etag")
+                    key = None
+                    if etag and start["status"] == 200:
+                        key = (scope["path"], scope["query_string"], etag, coding)
+                    compressed = self.compress_cached(key, coding, body)
+                    await send(encoded_start(len(compressed)))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                compressor = _StreamCompressor(coding, self.gzip_level, self.brotli_quality)
+                await send(encoded_start(None))
+
+            chunk = compressor.process(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
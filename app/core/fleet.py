@@ -0,0 +1,187 @@
+"""Columnar state store for a fleet of simulated machines"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Sensor channels: (minimum, maximum, random walk step per tick)
+CHANNELS = {
+    "speed": (0.0, 100.0, 3.0),
+    "temperature": (20.0, 95.0, 2.0),
+    "pressure": (0.0, 6.5, 0.3),
+    "vibration": (0.0, 3.0, 0.2),
+    "power": (0.0, 120.0, 5.0),
+}
+
+# Row of each channel in ``Fleet.values``
+CHANNEL_ROWS = {name: row for row, name in enumerate(CHANNELS)}
+
+# Channel values a machine (re)starts with
+START_VALUES = {
+    "speed": 75.0,
+    "temperature": 68.5,
+    "pressure": 4.2,
+    "vibration": 0.8,
+    "power": 85.0,
+}
+
+# Per-channel bounds and walk steps as column vectors, broadcast across machines
+_LOW, _HIGH, _WALK = (np.array(column).reshape(-1, 1) for column in zip(*CHANNELS.values()))
+_START = np.array([START_VALUES[name] for name in CHANNELS]).reshape(-1, 1)
+
+# Per-machine state arrays: (attribute, dtype, rows per machine). Wider
+# types come first so every array is aligned within a packed buffer.
+STATE_FIELDS = (
+    ("values", np.float64, len(CHANNELS)),
+    ("uptime_hours", np.float64, 1),
+    ("production_count", np.int64, 1),
+    ("error_count", np.int64, 1),
+    ("running", np.bool_, 1),
+    ("live", np.bool_, 1),
+)
+
+# Field order of a machine status record
+STATUS_FIELDS = (
+    "id", "running", *CHANNELS, "production_count", "error_count",
+    "last_maintenance", "uptime_hours",
+)
+
+
+def machine_ids(count: int) -> List[str]:
+    """Generate sequential machine identifiers"""
+    width = max(3, len(str(count)))
+    return [f"machine-{n:0{width}d}" for n in range(1, count + 1)]
+
+
+def state_nbytes(size: int) -> int:
+    """Bytes needed to hold the state arrays of ``size`` machines"""
+    return sum(np.dtype(dtype).itemsize * rows * size for _, dtype, rows in STATE_FIELDS)
+
+
+class Fleet:
+    """
+    State of many machines held in NumPy arrays.
+
+    Machine ``i`` is column ``i`` of ``values`` (one row per sensor
+    channel) and element ``i`` of every counter array. A simulation step
+    draws all random numbers for the tick in one call and updates every
+    channel of every running machine in one batched operation. Pass a
+    ``seed`` to make runs reproducible.
+
+    Machines that receive readings from field devices are marked ``live``
+    and are no longer advanced by the random walk.
+
+    The state arrays are packed into one buffer laid out as in
+    ``STATE_FIELDS``. Pass ``buffer`` (``state_nbytes(len(ids))`` bytes)
+    to keep them in memory owned elsewhere, such as a shared memory block;
+    its contents are then used as they are.
+    """
+
+    def __init__(self, ids: Sequence[str], seed: Optional[int] = None, buffer=None):
+        size = len(ids)
+        self.ids: List[str] = list(ids)
+        self.index: Dict[str, int] = {machine_id: i for i, machine_id in enumerate(self.ids)}
+        fresh = buffer is None
+        if fresh:
+            buffer = bytearray(state_nbytes(size))
+        offset = 0
+        for name, dtype, rows in STATE_FIELDS:
+            shape = (rows, size) if name == "values" else (size,)
+            array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            setattr(self, name, array)
+            offset += array.nbytes
+        # Per-channel row views into ``values``
+        self.channels: Dict[str, np.ndarray] = {
+            name: self.values[row] for row, name in enumerate(CHANNELS)
+        }
+        self.last_maintenance: List[str] = ["2025-12-01"] * size
+        self._rng = np.random.default_rng(seed)
+        if fresh:
+            self.initialize()
+
+    def initialize(self) -> None:
+        """Put every machine in its starting state"""
+        self.values[:] = _START
+        self.running[:] = True
+        self.live[:] = False
+        self.production_count[:] = 0
+        self.error_count[:] = 0
+        self.uptime_hours[:] = 245.5
+
+    def copy_from(self, other: "Fleet") -> None:
+        """Overwrite this fleet's state arrays with those of ``other``"""
+        for name, _, _ in STATE_FIELDS:
+            np.copyto(getattr(self, name), getattr(other, name))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def step(self, elapsed_seconds: float) -> bool:
+        """Advance every running machine by one tick, returning whether anything changed"""
+        running = self.running & ~self.live if self.live.any() else self.running
+        active = int(np.count_nonzero(running))
+        if not active:
+            return False
+
+        # One draw per channel for the random walk, plus the production and
+        # error Bernoulli trials, for every running machine at once
+        channels = len(CHANNELS)
+        draws = self._rng.random((channels + 2, active))
+        walk = (draws[:channels] * 2 - 1) * _WALK
+
+        if active == len(self.ids):
+            np.clip(self.values + walk, _LOW, _HIGH, out=self.values)
+            self.uptime_hours += elapsed_seconds / 3600
+            self.production_count += draws[channels] > 0.7
+            self.error_count += draws[channels + 1] > 0.95
+        else:
+            self.values[:, running] = np.clip(self.values[:, running] + walk, _LOW, _HIGH)
+            self.uptime_hours[running] += elapsed_seconds / 3600
+            self.production_count[running] += draws[channels] > 0.7
+            self.error_count[running] += draws[channels + 1] > 0.95
+        return True
+
+    def apply(self, rows: np.ndarray, columns: np.ndarray, values: np.ndarray) -> None:
+        """
+        Write measured channel values, one per ``(row, column)`` pair in
+        arrival order, and mark those machines live. When a pair repeats,
+        the last value wins.
+        """
+        # NumPy does not define which of several writes to one element lands,
+        # so keep only the last occurrence of each pair
+        cells = rows * len(self.ids) + columns
+        _, last = np.unique(cells[::-1], return_index=True)
+        keep = len(cells) - 1 - last
+        self.values[rows[keep], columns[keep]] = values[keep]
+        self.live[columns] = True
+
+    def start(self, i: int) -> None:
+        self.running[i] = True
+        self.values[:, i] = _START[:, 0]
+
+    def stop(self, i: int) -> None:
+        self.running[i] = False
+        self.channels["speed"][i] = 0.0
+        self.channels["power"][i] = 0.0
+
+    def reset(self, i: int) -> None:
+        self.production_count[i] = 0
+        self.error_count[i] = 0
+        self.uptime_hours[i] = 0.0
+
+    def status(self, i: int) -> Dict:
+        """Status record of a single machine"""
+        return self.statuses([i])[0]
+
+    def statuses(self, indices: Sequence[int]) -> List[Dict]:
+        """Status records of many machines, gathered column by column"""
+        rows = np.asarray(indices, dtype=np.intp)
+        columns = (
+            [self.ids[i] for i in indices],
+            self.running[rows].tolist(),
+            *(self.channels[name][rows].tolist() for name in CHANNELS),
+            self.production_count[rows].tolist(),
+            self.error_count[rows].tolist(),
+            [self.last_maintenance[i] for i in indices],
+            self.uptime_hours[rows].tolist(),
+        )
+        return [dict(zip(STATUS_FIELDS, row)) for row in zip(*columns)]
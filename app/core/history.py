@@ -0,0 +1,251 @@
+"""Bounded time-series history of fleet sensor readings"""
+from typing import Dict, List, Optional
+import uuid
+
+import numpy as np
+
+# Rollup tiers maintained alongside the raw samples: name -> bucket width in seconds
+ROLLUP_WIDTHS = {"1m": 60.0, "1h": 3600.0}
+
+
+class _Ring:
+    """
+    Fixed-capacity ring of time-ordered rows, overwritten oldest-first.
+
+    Rows are written in time order, so each of the (at most two)
+    contiguous segments of the ring is sorted and range lookups are
+    binary searches.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity)
+        self.size = 0
+        self._next = 0
+
+    def _advance(self) -> int:
+        """Claim the slot for a new row"""
+        i = self._next
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    @property
+    def oldest(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return float(self.timestamps[self._next if self.size == self.capacity else 0])
+
+    @property
+    def newest(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return float(self.timestamps[(self._next - 1) % self.capacity])
+
+    def covers(self, start: Optional[float]) -> bool:
+        """Whether no rows at or after ``start`` have been overwritten yet"""
+        if self.size < self.capacity:
+            return True
+        return start is not None and start >= self.oldest
+
+    def _select(self, start: Optional[float], end: Optional[float]) -> np.ndarray:
+        """Physical indices of rows with ``start <= t <= end``, oldest first"""
+        if self.size < self.capacity:
+            segments = [(0, self.size)]
+        else:
+            segments = [(self._next, self.capacity), (0, self._next)]
+
+        parts = []
+        for low, high in segments:
+            timestamps = self.timestamps[low:high]
+            first = 0 if start is None else int(np.searchsorted(timestamps, start, "left"))
+            last = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, "right"))
+            if first < last:
+                parts.append(np.arange(low + first, low + last))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+
+class _SampleRing(_Ring):
+    """Raw channels x machines samples, one row per tick"""
+
+    def __init__(self, capacity: int, channels: int, machines: int):
+        super().__init__(capacity)
+        self.values = np.zeros((capacity, channels, machines))
+
+    def record(self, timestamp: float, values: np.ndarray) -> None:
+        i = self._advance()
+        self.timestamps[i] = timestamp
+        self.values[i] = values
+
+    def query(self, channel: int, machine: int, start, end) -> Dict[str, np.ndarray]:
+        rows = self._select(start, end)
+        return {"timestamps": self.timestamps[rows], "values": self.values[rows, channel, machine]}
+
+
+class _RollupRing(_Ring):
+    """
+    Fixed-width min/max/sum/count buckets, updated in place as samples arrive.
+
+    Row timestamps are bucket start times; the newest bucket is still open.
+    """
+
+    def __init__(self, width: float, capacity: int, channels: int, machines: int):
+        super().__init__(capacity)
+        self.width = width
+        self.minimum = np.zeros((capacity, channels, machines))
+        self.maximum = np.zeros((capacity, channels, machines))
+        self.total = np.zeros((capacity, channels, machines))
+        self.count = np.zeros(capacity, dtype=np.int64)
+
+    def record(self, timestamp: float, values: np.ndarray) -> None:
+        bucket = timestamp - timestamp % self.width
+        i = (self._next - 1) % self.capacity
+        if self.size and self.timestamps[i] == bucket:
+            np.minimum(self.minimum[i], values, out=self.minimum[i])
+            np.maximum(self.maximum[i], values, out=self.maximum[i])
+            self.total[i] += values
+            self.count[i] += 1
+            return
+
+        i = self._advance()
+        self.timestamps[i] = bucket
+        self.minimum[i] = values
+        self.maximum[i] = values
+        self.total[i] = values
+        self.count[i] = 1
+
+    def query(self, channel: int, machine: int, start, end) -> Dict[str, np.ndarray]:
+        # Include the bucket already open at ``start``
+        rows = self._select(None if start is None else start - self.width, end)
+        if start is not None and len(rows) and self.timestamps[rows[0]] + self.width <= start:
+            rows = rows[1:]
+        count = self.count[rows]
+        return {
+            "timestamps": self.timestamps[rows],
+            "values": self.total[rows, channel, machine] / count,
+            "min": self.minimum[rows, channel, machine],
+            "max": self.maximum[rows, channel, machine],
+            "count": count,
+        }
+
+
+def lttb(timestamps: np.ndarray, values: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of ``threshold`` points chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves peaks and troughs.
+    """
+    size = len(values)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    x = timestamps.tolist()
+    y = values.tolist()
+    every = (size - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, size)
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+
+        ax, ay = x[a], y[a]
+        best_area = -1.0
+        for j in range(int(bucket * every) + 1, next_start):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                a = j
+        selected.append(a)
+    selected.append(size - 1)
+    return np.array(selected)
+
+
+class History:
+    """
+    Fixed-memory sensor history of the whole fleet at several resolutions.
+
+    Every tick is stored raw in a ring of ``capacity`` samples and folded
+    into the 1-minute and 1-hour rollup rings, so long ranges can be
+    answered from pre-aggregated buckets. Query results are capped at
+    ``max_points`` and reduced with LTTB beyond that, so response size is
+    bounded whatever range is requested.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        rollup_capacities: Dict[str, int],
+        channels: int,
+        machines: int,
+        sample_seconds: float,
+        max_points: int,
+    ):
+        self.sample_seconds = sample_seconds
+        self.max_points = max_points
+        # Bumped on every recorded sample; query results only change with it
+        self.revision = 0
+        self._epoch = uuid.uuid4().hex[:8]
+        self.tiers: Dict[str, _Ring] = {"raw": _SampleRing(capacity, channels, machines)}
+        for name, width in ROLLUP_WIDTHS.items():
+            self.tiers[name] = _RollupRing(width, rollup_capacities[name], channels, machines)
+
+    @property
+    def resolutions(self) -> List[str]:
+        return ["auto", *self.tiers]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.revision}"'
+
+    def record(self, timestamp: float, values: np.ndarray) -> None:
+        """Append one channels x machines sample to every tier"""
+        for tier in self.tiers.values():
+            tier.record(timestamp, values)
+        self.revision += 1
+
+    def _pick_resolution(self, start: Optional[float], end: Optional[float], points: int) -> str:
+        """Finest tier that still holds ``start`` and spans the range in ``points`` rows"""
+        widths = {"raw": self.sample_seconds, **ROLLUP_WIDTHS}
+        for name, tier in self.tiers.items():
+            if not tier.covers(start) or not tier.size:
+                continue
+            first = tier.oldest if start is None else start
+            last = tier.newest if end is None else end
+            if (last - first) / widths[name] <= points:
+                return name
+        return list(self.tiers)[-1]
+
+    def query(
+        self,
+        channel: int,
+        machine: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        step: Optional[float] = None,
+        resolution: str = "auto",
+        points: Optional[int] = None,
+    ) -> Dict:
+        """
+        History of one channel of one machine with ``start <= t <= end``.
+
+        With ``step``, only the first row of every ``step``-second bucket is
+        kept. Results longer than ``points`` (at most ``max_points``) are
+        downsampled with LTTB.
+        """
+        points = min(points or self.max_points, self.max_points)
+        if resolution == "auto":
+            resolution = self._pick_resolution(start, end, points)
+        series = self.tiers[resolution].query(channel, machine, start, end)
+
+        if step and len(series["timestamps"]):
+            _, keep = np.unique(series["timestamps"] // step, return_index=True)
+            series = {key: column[keep] for key, column in series.items()}
+        if len(series["timestamps"]) > points:
+            keep = lttb(series["timestamps"], series["values"], points)
+            series = {key: column[keep] for key, column in series.items()}
+
+        return {"resolution": resolution, **{key: column.tolist() for key, column in series.items()}}
@@ -0,0 +1,37 @@
+"""HTTP helpers shared by routes and middleware"""
+from typing import Container
+
+from starlette.requests import HTTPConnection
+
+# Preferred first when a client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def etag_matches(request: HTTPConnection, etag: str) -> bool:
+    """Check an If-None-Match request header against the current ETag"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def negotiate_encoding(accept_encoding: str, available: Container[str]) -> str:
+    """
+    Best content coding from an Accept-Encoding header among ``available``,
+    or "identity" when none is acceptable
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip())
+    for coding in ENCODINGS:
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return "identity"
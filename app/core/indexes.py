@@ -0,0 +1,119 @@
+"""Secondary indexes for the in-memory stores"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class SortedIndex:
+    """
+    Record IDs ordered by a sort key, stored as a sorted list of
+    ``(key, record_id)`` pairs.
+
+    Lookups and range bounds are binary searches; a page of a range is a
+    list slice, so a query costs O(log N + page size).
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[Any, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Any, record_id: str) -> None:
+        insort(self._entries, (key, record_id))
+
+    def add_many(self, entries: Iterable[Tuple[Any, str]]) -> None:
+        """Add many ``(key, record_id)`` entries with a single re-sort"""
+        self._entries.extend(entries)
+        self._entries.sort()
+
+    def remove(self, key: Any, record_id: str) -> None:
+        entry = (key, record_id)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def range(
+        self,
+        low: Any = None,
+        high: Any = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, str]] = None
+    ) -> List[Tuple[Any, str]]:
+        """
+        ``(key, record_id)`` entries with ``low <= key <= high`` (unbounded
+        when ``None``), paginated. With ``after``, the range starts right
+        after that entry, which is what keyset pagination resumes from.
+        """
+        entries = self._entries
+        first = 0 if low is None else bisect_left(entries, low, key=_sort_key)
+        last = len(entries) if high is None else bisect_right(entries, high, key=_sort_key)
+        if after is not None:
+            first = max(first, bisect_right(entries, after))
+        first += skip
+        if limit is not None:
+            last = min(last, first + limit)
+        return entries[first:last]
+
+
+def _sort_key(entry: Tuple[Any, str]) -> Any:
+    return entry[0]
+
+
+class HashIndex:
+    """
+    Record IDs grouped by an exact-match field value.
+
+    Each group is a :class:`SortedIndex` on a secondary key, so a lookup
+    can be combined with a range condition on that key.
+    """
+
+    def __init__(self):
+        self._groups: Dict[Any, SortedIndex] = {}
+
+    def add(self, value: Any, key: Any, record_id: str) -> None:
+        group = self._groups.get(value)
+        if group is None:
+            group = self._groups[value] = SortedIndex()
+        group.add(key, record_id)
+
+    def add_many(self, entries: Iterable[Tuple[Any, Any, str]]) -> None:
+        """Add many ``(value, key, record_id)`` entries, re-sorting each group once"""
+        grouped: Dict[Any, List[Tuple[Any, str]]] = {}
+        for value, key, record_id in entries:
+            grouped.setdefault(value, []).append((key, record_id))
+        for value, group_entries in grouped.items():
+            group = self._groups.get(value)
+            if group is None:
+                group = self._groups[value] = SortedIndex()
+            group.add_many(group_entries)
+
+    def remove(self, value: Any, key: Any, record_id: str) -> None:
+        group = self._groups.get(value)
+        if group is None:
+            return
+        group.remove(key, record_id)
+        if not group:
+            del self._groups[value]
+
+    def get(self, value: Any) -> SortedIndex:
+        return self._groups.get(value) or SortedIndex()
+
+
+class UniqueIndex:
+    """Maps each value of a unique field to the ID of the record holding it"""
+
+    def __init__(self):
+        self._owners: Dict[Any, str] = {}
+
+    def is_taken(self, value: Any, record_id: Optional[str] = None) -> bool:
+        """Whether ``value`` belongs to a record other than ``record_id``"""
+        owner = self._owners.get(value)
+        return owner is not None and owner != record_id
+
+    def add(self, value: Any, record_id: str) -> None:
+        self._owners[value] = record_id
+
+    def remove(self, value: Any, record_id: str) -> None:
+        if self._owners.get(value) == record_id:
+            del self._owners[value]
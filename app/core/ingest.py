@@ -0,0 +1,177 @@
+"""Ingestion of sensor readings from field devices"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import math
+
+import numpy as np
+import orjson
+
+from app.core import metrics
+from app.core.fleet import CHANNEL_ROWS
+from app.core.simulation import MachineSimulator
+from app.db.base import pause_between_chunks
+
+try:
+    import msgpack
+except ImportError:  # msgpack frames are rejected
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Errors reported back per request; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+class IngestFormatError(ValueError):
+    """A frame could not be decoded"""
+
+
+class QueueFullError(RuntimeError):
+    """The ingestion queue stayed full for longer than the submit timeout"""
+
+
+def decode_ndjson(body: bytes) -> List[Any]:
+    """Readings of an NDJSON body, or of a body holding one JSON array"""
+    try:
+        if body.lstrip()[:1] == b"[":
+            rows = orjson.loads(body)
+        else:
+            rows = [orjson.loads(line) for line in body.splitlines() if line.strip()]
+    except orjson.JSONDecodeError as exc:
+        raise IngestFormatError(f"Invalid JSON: {exc}") from exc
+    if not isinstance(rows, list):
+        raise IngestFormatError("Expected a JSON array or NDJSON")
+    return rows
+
+
+def decode_msgpack(body: bytes) -> List[Any]:
+    """Readings of a msgpack frame holding an array of maps"""
+    if msgpack is None:
+        raise IngestFormatError("msgpack frames are not supported by this server")
+    try:
+        rows = msgpack.unpackb(body)
+    except (ValueError, TypeError, msgpack.UnpackException) as exc:
+        raise IngestFormatError(f"Invalid msgpack: {exc or type(exc).__name__}") from exc
+    if not isinstance(rows, list):
+        raise IngestFormatError("Expected a msgpack array of readings")
+    return rows
+
+
+class Ingestor:
+    """
+    Bounded buffer between device connections and the fleet state.
+
+    Producers convert readings to ``(channel row, machine, value)``
+    arrays and wait for room in the queue, so a flood of readings slows
+    its senders down instead of growing memory. A single consumer drains
+    every queued batch at once and writes them to the fleet in one
+    vectorized assignment, committed as one simulator update.
+    """
+
+    def __init__(self, simulator: MachineSimulator, queue_size: int):
+        self.simulator = simulator
+        self.fleet = simulator.fleet
+        self.queue_size = queue_size
+        # Created per event loop, as an asyncio.Queue only works in one
+        self.queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.accepted = 0
+        self.rejected = 0
+        self.applied = 0
+
+    def _queue(self) -> asyncio.Queue:
+        """The queue for the running event loop, created on first use in it"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        return self.queue
+
+    @property
+    def depth(self) -> int:
+        """Batches waiting to be applied"""
+        return 0 if self.queue is None else self.queue.qsize()
+
+    async def convert(self, readings: Sequence[Any]) -> Tuple[Tuple[np.ndarray, ...], List[Dict]]:
+        """
+        Split readings into channel rows, machine columns and values.
+
+        A reading is a map with a ``machine`` ID and one or more channel
+        values; a ``timestamp`` field is ignored, as readings are applied
+        in arrival order. Malformed readings are skipped and reported.
+        Other tasks run between chunks of a large frame.
+        """
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        errors: List[Dict] = []
+        index = self.fleet.index
+        for n, reading in enumerate(readings):
+            await pause_between_chunks(n)
+            try:
+                column = index[reading["machine"]]
+                fields = [
+                    (CHANNEL_ROWS[name], float(value))
+                    for name, value in reading.items() if name not in ("machine", "timestamp")
+                ]
+                if not fields:
+                    raise ValueError("no channel values")
+                if not all(math.isfinite(value) for _, value in fields):
+                    raise ValueError("values must be finite")
+            except (KeyError, TypeError, ValueError) as exc:
+                errors.append({"index": n, "error": _describe(reading, exc)})
+                continue
+            for row, value in fields:
+                rows.append(row)
+                columns.append(column)
+                values.append(value)
+        arrays = (
+            np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp), np.array(values)
+        )
+        return arrays, errors
+
+    async def submit(self, readings: Sequence[Any], timeout: Optional[float] = None) -> Dict:
+        """
+        Queue readings for the next micro-batch, waiting up to ``timeout``
+        seconds for room. Raises QueueFullError if there is none.
+        """
+        arrays, errors = await self.convert(readings)
+        accepted = len(readings) - len(errors)
+        if accepted:
+            try:
+                await asyncio.wait_for(self._queue().put(arrays), timeout)
+            except asyncio.TimeoutError:
+                raise QueueFullError("Ingestion queue is full")
+        self.accepted += accepted
+        self.rejected += len(errors)
+        metrics.ingested_readings.inc(("accepted",), accepted)
+        metrics.ingested_readings.inc(("rejected",), len(errors))
+        return {
+            "accepted": accepted,
+            "rejected": len(errors),
+            "errors": errors[:MAX_REPORTED_ERRORS]
+        }
+
+    async def run(self) -> None:
+        """Apply queued readings forever, one micro-batch per wake-up"""
+        queue = self._queue()
+        while True:
+            batches = [await queue.get()]
+            while not queue.empty():
+                batches.append(queue.get_nowait())
+            if len(batches) == 1:
+                rows, columns, values = batches[0]
+            else:
+                rows, columns, values = (np.concatenate(parts) for parts in zip(*batches))
+            self.simulator.update(lambda fleet: fleet.apply(rows, columns, values))
+            self.applied += len(values)
+            # Let producers refill the queue before the next micro-batch
+            await asyncio.sleep(0)
+
+
+def _describe(reading: Any, exc: Exception) -> str:
+    if not isinstance(reading, dict):
+        return "Reading must be an object with a machine ID and channel values"
+    if isinstance(exc, KeyError):
+        return f"Unknown machine or channel: {exc.args[0]}"
+    return f"Invalid value: {exc}"
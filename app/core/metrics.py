@@ -0,0 +1,254 @@
+"""
+Process-local metrics exposed in the Prometheus text format.
+
+Updates are plain integer and float arithmetic on the event loop thread,
+so no locks are needed; rendering walks the registry on each scrape.
+Every worker process keeps its own metrics.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import time
+
+from starlette.routing import Mount
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Starlette appends the charset to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+Labels = Tuple[str, ...]
+
+registry: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """A named metric family with a fixed set of label names"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        registry.append(self)
+
+    def _series(self, labels: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines of every series in this family"""
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples()
+        ]
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._series(labels)} {_number(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Metric):
+    """
+    Value that goes up and down. With ``function``, the value is read
+    from it at scrape time instead.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+        self.function = function
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self.values[labels] = value
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_number(self.function())}"]
+        return [
+            f"{self.name}{self._series(labels)} {_number(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed buckets. Counts are kept
+    per bucket and made cumulative only when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: bucket counts (the last one is +Inf), then the sum
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._series(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._series(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._series(labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+requests_total = Counter(
+    "http_requests_total", "HTTP requests completed", ("method", "route", "status")
+)
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+response_size = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS
+)
+tick_duration = Histogram(
+    "simulation_tick_duration_seconds", "Time spent computing one simulation tick"
+)
+stream_subscribers = Gauge("websocket_subscribers", "Connected WebSocket stream subscribers")
+active_alarms = Gauge("alarms_active", "Alarms currently raised across the fleet")
+ingested_readings = Counter(
+    "ingest_readings_total", "Field device readings received, by result", ("result",)
+)
+ingest_queue_depth = Gauge("ingest_queue_batches", "Reading batches waiting to be applied")
+cache_lookups = Counter(
+    "response_cache_lookups_total", "Response cache lookups, by tier and result", ("tier", "result")
+)
+cache_entries = Gauge("response_cache_entries", "Responses held in the in-process cache")
+commands_total = Counter(
+    "machine_commands_total", "Machine control commands processed", ("action", "status")
+)
+
+UNMATCHED = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording count, latency and response size per route.
+
+    Routes are labelled by their path template, so IDs in URLs do not
+    create new series; requests matching no route share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates: Optional[Dict[Callable, str]] = None
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+        if self._templates is None:
+            self._templates = {}
+            for route in scope["app"].routes:
+                if isinstance(route, Mount):
+                    # A mounted app is the endpoint of every path below it
+                    self._templates[route.app] = f"{route.path}/{{path}}"
+                elif hasattr(route, "endpoint"):
+                    self._templates[route.endpoint] = route.path
+        return self._templates.get(endpoint, UNMATCHED)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            duration = time.perf_counter() - started
+            requests_in_flight.dec()
+            key = (scope["method"], self._route(scope))
+            requests_total.inc((*key, str(status_code)))
+            request_duration.observe(duration, key)
+            response_size.observe(size, key)
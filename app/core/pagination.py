@@ -0,0 +1,64 @@
+"""Opaque keyset pagination cursors"""
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import base64
+import json
+
+from app.core.indexes import SortedIndex
+
+
+def encode_cursor(order: str, key: Any, record_id: str) -> str:
+    """Encode the position of the last record of a page under an ordering"""
+    if isinstance(key, datetime):
+        key = {"datetime": key.isoformat()}
+    raw = json.dumps([order, key, record_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str) -> Tuple[Any, str]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises ValueError if the cursor is malformed or was issued for a
+    different ordering.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, key, record_id = json.loads(raw)
+        if isinstance(key, dict):
+            key = datetime.fromisoformat(key["datetime"])
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if cursor_order != order or not isinstance(record_id, str):
+        raise ValueError("Cursor does not match this query")
+    return key, record_id
+
+
+def keyset_page(
+    index: SortedIndex,
+    order: str,
+    cursor: Optional[str],
+    skip: int,
+    limit: int,
+    low: Any = None,
+    high: Any = None
+) -> Tuple[List[str], Optional[str]]:
+    """
+    One page of record IDs from ``index``, resuming after ``cursor``.
+
+    Returns the IDs and the cursor of the next page, or ``None`` on the
+    last page. Each page costs O(log N + limit) however deep it is, and
+    inserts before the cursor position do not shift later pages.
+    """
+    after = decode_cursor(cursor, order) if cursor else None
+    try:
+        # One extra entry tells whether there is a next page
+        entries = index.range(low, high, skip, limit + 1, after)
+    except TypeError as exc:
+        # Cursor key not comparable with this index's keys
+        raise ValueError("Cursor does not match this query") from exc
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(order, *entries[-1])
+    return [record_id for _, record_id in entries], next_cursor
@@ -0,0 +1,201 @@
+"""Fleet state shared by every worker process through shared memory"""
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Optional, Sequence, Tuple
+import os
+import tempfile
+import uuid
+
+import numpy as np
+
+from app.core.command_log import CommandLog, log_nbytes
+from app.core.fleet import Fleet, state_nbytes
+
+try:
+    import fcntl
+except ImportError:  # no cross-process file locks; state stays per process
+    fcntl = None
+
+SUPPORTED = fcntl is not None
+
+# "SCADA" plus the layout version, so a block with another layout is replaced
+MAGIC = 0x5343414441_000002
+
+# Header words, then the fleet arrays from HEADER_BYTES on, then the command log
+_MAGIC, _SIZE, _SEQUENCE, _VERSION, _EPOCH, _TICKS, _TICK_TIME, _COMMANDS = range(8)
+HEADER_WORDS = 8
+HEADER_BYTES = HEADER_WORDS * 8
+
+# Snapshot attempts before a reader gives up and keeps its previous copy,
+# e.g. when a writer died in the middle of a write
+READ_ATTEMPTS = 10000
+
+
+class SharedFleetState:
+    """
+    Fleet state in a named shared memory block with a fixed layout: a
+    64-byte header of 64-bit words (magic, fleet size, sequence, version,
+    ETag epoch, tick count, tick time, command log capacity) followed by
+    the fleet arrays packed as in ``fleet.STATE_FIELDS`` and a log of the
+    last ``command_capacity`` control commands.
+
+    Writes from any process are serialized by an exclusive file lock and
+    bracketed by a seqlock: the sequence number is odd while a write is in
+    progress. Readers copy the arrays without taking any lock and retry if
+    the sequence moved meanwhile, so every copy is a consistent snapshot
+    and readers never hold up a writer.
+
+    One process at a time holds the writer role, which advances the
+    simulation. The role is a file lock too, so when its holder exits
+    another process can claim it.
+
+    The block outlives the processes using it, so workers can restart
+    without losing state; it is replaced only when the layout or fleet
+    size changes. ``seed`` seeds the random walk of whichever process
+    holds the writer role.
+
+    The command log is shared under the same file lock, so an idempotency
+    key claimed by one worker is seen by all of them.
+    """
+
+    def __init__(
+        self, name: str, ids: Sequence[str], seed: Optional[int] = None, command_capacity: int = 0
+    ):
+        self.name = name
+        lock_directory = tempfile.gettempdir()
+        self._lock_file = open(os.path.join(lock_directory, f"{name}.lock"), "a+b")
+        self._role_file = open(os.path.join(lock_directory, f"{name}.writer"), "a+b")
+        self.is_writer = False
+
+        size = len(ids)
+        with self._locked():
+            self._shm = (
+                self._attach(size, command_capacity) or self._create(size, command_capacity)
+            )
+        # The block is shared with processes this one does not manage, so
+        # keep the resource tracker from unlinking it when this one exits
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        self._header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=self._shm.buf)
+        self._tick_time = np.ndarray((1,), dtype=np.float64, buffer=self._shm.buf, offset=_TICK_TIME * 8)
+        self.fleet = Fleet(ids, seed=seed, buffer=self._shm.buf[HEADER_BYTES:])
+        self.command_log = CommandLog(
+            ids, command_capacity, buffer=self._shm.buf[_log_offset(size):], lock=self._locked
+        )
+        self.epoch = f"{int(self._header[_EPOCH]):08x}"
+
+    def _attach(self, size: int, command_capacity: int) -> Optional[shared_memory.SharedMemory]:
+        """The existing block, if there is one with the expected layout"""
+        try:
+            shm = shared_memory.SharedMemory(self.name)
+        except FileNotFoundError:
+            return None
+        header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        valid = (
+            shm.size >= _log_offset(size) + log_nbytes(command_capacity)
+            and header[_MAGIC] == MAGIC
+            and header[_SIZE] == size
+            and header[_COMMANDS] == command_capacity
+        )
+        del header
+        if not valid:
+            shm.close()
+            shm.unlink()
+            return None
+        return shm
+
+    def _create(self, size: int, command_capacity: int) -> shared_memory.SharedMemory:
+        shm = shared_memory.SharedMemory(
+            self.name, create=True, size=_log_offset(size) + log_nbytes(command_capacity)
+        )
+        header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        Fleet(["-"] * size, buffer=shm.buf[HEADER_BYTES:]).initialize()
+        header[_SIZE] = size
+        header[_COMMANDS] = command_capacity
+        header[_EPOCH] = uuid.uuid4().int & 0xFFFFFFFF
+        header[_MAGIC] = MAGIC
+        del header
+        return shm
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def claim_writer(self) -> bool:
+        """Take the writer role if no other process holds it, returning whether this one does"""
+        if not self.is_writer:
+            try:
+                fcntl.flock(self._role_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            self.is_writer = True
+        return True
+
+    @property
+    def version(self) -> int:
+        """Number of writes that changed the fleet"""
+        return int(self._header[_VERSION])
+
+    @property
+    def ticks(self) -> int:
+        """Number of simulation ticks taken"""
+        return int(self._header[_TICKS])
+
+    def write(self, change: Callable[[Fleet], Any], tick_time: Optional[float] = None) -> Any:
+        """
+        Apply ``change`` to the shared fleet and bump the version unless it
+        returns False. With ``tick_time``, also record a simulation tick.
+        """
+        header = self._header
+        with self._locked():
+            if header[_SEQUENCE] % 2:
+                # The previous writer died mid-write; its changes stand
+                header[_SEQUENCE] += 1
+            header[_SEQUENCE] += 1
+            try:
+                result = change(self.fleet)
+                if result is not False:
+                    header[_VERSION] += 1
+                if tick_time is not None:
+                    self._tick_time[0] = tick_time
+                    header[_TICKS] += 1
+            finally:
+                header[_SEQUENCE] += 1
+        return result
+
+    def read(self, into: Fleet) -> Optional[Tuple[int, int, float]]:
+        """
+        Copy a consistent snapshot of the shared fleet into ``into``,
+        returning its version, tick count and last tick time, or None if
+        no consistent copy could be taken
+        """
+        header = self._header
+        for _ in range(READ_ATTEMPTS):
+            sequence = header[_SEQUENCE]
+            if sequence % 2:
+                continue
+            into.copy_from(self.fleet)
+            version, ticks, tick_time = int(header[_VERSION]), int(header[_TICKS]), float(self._tick_time[0])
+            if header[_SEQUENCE] == sequence:
+                return version, ticks, tick_time
+        return None
+
+    def close(self) -> None:
+        """Release this process's mapping of the block and its writer role"""
+        if self.is_writer:
+            fcntl.flock(self._role_file, fcntl.LOCK_UN)
+            self.is_writer = False
+        # Every view into the block has to go before it can be unmapped
+        self.fleet = self.command_log = self._header = self._tick_time = None
+        self._shm.close()
+        self._lock_file.close()
+        self._role_file.close()
+
+
+def _log_offset(size: int) -> int:
+    """Start of the command log, on a word boundary after the fleet arrays"""
+    return (HEADER_BYTES + state_nbytes(size) + 7) // 8 * 8
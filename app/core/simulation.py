@@ -0,0 +1,189 @@
+"""Machine simulation engine"""
+import asyncio
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import orjson
+
+from app.core import metrics
+from app.core.fleet import Fleet
+from app.core.shared_state import SharedFleetState
+
+
+def encode(data) -> bytes:
+    """Compact JSON encoding used for all cached payloads"""
+    return orjson.dumps(data)
+
+
+class MachineSimulator:
+    """
+    Advances a fleet of simulated machines at a fixed tick rate.
+
+    The fleet is only ever written by the tick loop, the control
+    operations and ingested readings, all through ``update``. Each change
+    is committed as a new version, and JSON payloads are encoded at most
+    once per version, so reads never mutate or re-serialize anything.
+    Machine 0 is the primary machine shown on the dashboard; its payload
+    is encoded eagerly for the status stream.
+
+    With a ``shared`` state, the fleet lives in shared memory and ``fleet``
+    is this process's snapshot of it. Changes are written to the shared
+    block, only the process holding the writer role runs the tick loop,
+    and every process catches up with ``sync``: on each read of the
+    status, and every ``poll_seconds`` in the background so that stream
+    subscribers and tick listeners see every version and tick.
+    """
+
+    def __init__(
+        self,
+        fleet: Fleet,
+        tick_seconds: float,
+        shared: Optional[SharedFleetState] = None,
+        poll_seconds: float = 0.1
+    ):
+        self.fleet = fleet
+        self.tick_seconds = tick_seconds
+        self.shared = shared
+        self.poll_seconds = poll_seconds
+        self.version = 0
+        self._ticks: Optional[int] = None
+        # Keeps ETags from colliding with those handed out before a restart;
+        # shared state carries one epoch so every worker hands out the same tags
+        self._epoch = shared.epoch if shared is not None else uuid.uuid4().hex[:8]
+        self._listeners: List[Callable[[bytes], None]] = []
+        self._tick_listeners: List[Callable[[float], None]] = []
+        self._payloads: Dict = {}
+        if shared is None:
+            self.commit()
+        else:
+            # Publish whatever the shared version is
+            self.version = -1
+            self.sync()
+            if self.version < 0:
+                # No consistent snapshot could be read; start from this copy
+                self.version = 0
+                self._publish()
+
+    def add_listener(self, listener: Callable[[bytes], None]) -> None:
+        """Register a callback invoked with the primary machine payload of every new version"""
+        self._listeners.append(listener)
+
+    def add_tick_listener(self, listener: Callable[[float], None]) -> None:
+        """Register a callback invoked with the wall-clock time after every tick"""
+        self._tick_listeners.append(listener)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self.version}"'
+
+    def commit(self) -> None:
+        """Publish the current fleet state as a new read version"""
+        self.version += 1
+        self._publish()
+
+    def _publish(self) -> None:
+        self._payloads = {}
+        self.snapshot = self.fleet.status(0)
+        self.payload = self._payloads[0] = encode(self.snapshot)
+        for listener in self._listeners:
+            listener(self.payload)
+
+    def _tick(self, now: float) -> None:
+        for listener in self._tick_listeners:
+            listener(now)
+
+    def sync(self) -> None:
+        """Catch up with changes other processes made to the shared state"""
+        shared = self.shared
+        if shared is None or (shared.version == self.version and shared.ticks == self._ticks):
+            return
+        snapshot = shared.read(self.fleet)
+        if snapshot is None:
+            return
+        version, ticks, tick_time = snapshot
+        if version != self.version:
+            self.version = version
+            self._publish()
+        if ticks != self._ticks:
+            # Ticks taken before this process started are not replayed
+            if self._ticks is not None:
+                self._tick(tick_time)
+            self._ticks = ticks
+
+    def update(self, change: Callable[[Fleet], Optional[bool]]) -> None:
+        """Apply ``change`` to the fleet and commit it, unless it returns False"""
+        if self.shared is None:
+            if change(self.fleet) is not False:
+                self.commit()
+        else:
+            self.shared.write(change)
+            self.sync()
+
+    def machine_payload(self, index: int) -> bytes:
+        """Encoded status of one machine at the current version"""
+        payload = self._payloads.get(index)
+        if payload is None:
+            payload = self._payloads[index] = encode(self.fleet.status(index))
+        return payload
+
+    def fleet_payload(self) -> bytes:
+        """Encoded status of every machine at the current version"""
+        payload = self._payloads.get("fleet")
+        if payload is None:
+            payload = self._payloads["fleet"] = encode(self.fleet.statuses(range(len(self.fleet))))
+        return payload
+
+    def start(self, index: int = 0) -> None:
+        self.update(lambda fleet: fleet.start(index))
+
+    def stop(self, index: int = 0) -> None:
+        self.update(lambda fleet: fleet.stop(index))
+
+    def reset(self, index: int = 0) -> None:
+        self.update(lambda fleet: fleet.reset(index))
+
+    def step(self) -> None:
+        """Advance the simulation by one tick"""
+        now = time.time()
+        if self.shared is None:
+            if self.fleet.step(self.tick_seconds):
+                self.commit()
+            self._tick(now)
+        else:
+            self.shared.write(lambda fleet: fleet.step(self.tick_seconds), tick_time=now)
+            self.sync()
+
+    async def _follow(self, seconds: float) -> None:
+        """Wait ``seconds``, picking up shared state changes meanwhile"""
+        if self.shared is None:
+            await asyncio.sleep(seconds)
+            return
+        deadline = time.monotonic() + seconds
+        while True:
+            self.sync()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, self.poll_seconds))
+
+    async def run(self) -> None:
+        """Tick forever on a fixed schedule, independent of read load"""
+        next_tick = time.monotonic()
+        while True:
+            if self.shared is not None and not self.shared.claim_writer():
+                # Another process advances the simulation; follow it and try
+                # again for the role after a tick
+                await self._follow(self.tick_seconds)
+                next_tick = time.monotonic()
+                continue
+            started = time.perf_counter()
+            self.step()
+            metrics.tick_duration.observe(time.perf_counter() - started)
+            next_tick += self.tick_seconds
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Fell behind; skip the missed ticks rather than bursting
+                next_tick = time.monotonic()
+                delay = 0
+            await self._follow(delay)
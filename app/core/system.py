@@ -0,0 +1,58 @@
+"""Background sampling of host CPU, memory and disk usage"""
+from typing import Optional
+import asyncio
+import time
+
+import psutil
+
+from app.core.config import settings
+
+
+class SystemSampler:
+    """
+    Collects system metrics on a fixed interval into a cached snapshot,
+    so health probes never wait on psutil.
+
+    CPU usage is measured over the time since the previous sample rather
+    than by sleeping, and the psutil calls run in a worker thread.
+    """
+
+    def __init__(self, interval: float, disk_path: str = "/"):
+        self.interval = interval
+        self.disk_path = disk_path
+        self.snapshot: Optional[dict] = None
+        self.sampled_at: Optional[float] = None
+
+    def sample(self) -> dict:
+        """Take a sample now and cache it"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        self.snapshot = {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory": {
+                "total_mb": round(memory.total / (1024 * 1024), 2),
+                "used_mb": round(memory.used / (1024 * 1024), 2),
+                "percent": memory.percent
+            },
+            "disk": {
+                "total_gb": round(disk.total / (1024 * 1024 * 1024), 2),
+                "used_gb": round(disk.used / (1024 * 1024 * 1024), 2),
+                "percent": disk.percent
+            }
+        }
+        self.sampled_at = time.time()
+        return self.snapshot
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the cached sample was taken"""
+        return None if self.sampled_at is None else time.time() - self.sampled_at
+
+    async def run(self) -> None:
+        """Resample forever on the configured interval"""
+        while True:
+            await asyncio.to_thread(self.sample)
+            await asyncio.sleep(self.interval)
+
+
+sampler = SystemSampler(settings.SYSTEM_SAMPLE_SECONDS)
@@ -0,0 +1,26 @@
+"""Storage backends behind the items and users routers"""
+from app.core.config import settings
+from app.db.base import Storage
+from app.db.memory import MemoryStorage
+
+
+def sqlite_path(url: str) -> str:
+    """Database path of a ``sqlite:///relative`` or ``sqlite:////absolute`` URL"""
+    path = url[len("sqlite://"):]
+    if path.startswith("/"):
+        path = path[1:]
+    return path or ":memory:"
+
+
+def create_storage(url: str, pool_size: int) -> Storage:
+    """Storage backend selected by the scheme of a database URL"""
+    scheme = url.split(":", 1)[0]
+    if scheme == "memory":
+        return MemoryStorage()
+    if scheme == "sqlite":
+        from app.db.sqlite import SQLiteStorage
+        return SQLiteStorage(sqlite_path(url), pool_size)
+    raise ValueError(f"Unsupported DATABASE_URL scheme: {scheme}")
+
+
+storage = create_storage(settings.DATABASE_URL, settings.DATABASE_POOL_SIZE)
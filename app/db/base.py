@@ -0,0 +1,236 @@
+"""Repository interfaces shared by all storage backends"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
+import asyncio
+
+from app.core.config import settings
+
+# A page of records plus the cursor of the next page, if any
+Page = Tuple[List[dict], Optional[str]]
+
+
+class ConflictError(ValueError):
+    """A write would violate a uniqueness constraint"""
+
+
+class InsufficientStockError(ValueError):
+    """A stock adjustment would make the quantity negative"""
+
+
+async def pause_between_chunks(index: int) -> None:
+    """Let other requests run between chunks of a long batch"""
+    if index and index % settings.BATCH_CHUNK_ROWS == 0:
+        await asyncio.sleep(0)
+
+
+class ItemRepository(ABC):
+    """
+    Storage of inventory items.
+
+    The ``*_many`` methods apply a whole batch in one pass; the defaults
+    loop over the single-row methods, letting other requests run every
+    ``BATCH_CHUNK_ROWS`` rows, and backends with per-call overhead
+    override them.
+    """
+
+    @abstractmethod
+    async def add(self, item: dict) -> dict:
+        """Store a new item"""
+
+    @abstractmethod
+    async def get(self, item_id: str) -> Optional[dict]:
+        """Item by ID, or None"""
+
+    @abstractmethod
+    async def update(self, item_id: str, changes: dict) -> Optional[dict]:
+        """Apply field changes to an item, returning it, or None if missing"""
+
+    @abstractmethod
+    async def delete(self, item_id: str) -> bool:
+        """Delete an item, returning whether it existed"""
+
+    async def add_many(self, items: Sequence[dict]) -> None:
+        """Store many new items"""
+        for index, item in enumerate(items):
+            await pause_between_chunks(index)
+            await self.add(item)
+
+    async def update_many(self, updates: Sequence[Tuple[str, dict]]) -> List[Optional[dict]]:
+        """Apply ``(item_id, changes)`` pairs, returning each updated item or None if missing"""
+        results = []
+        for index, (item_id, changes) in enumerate(updates):
+            await pause_between_chunks(index)
+            results.append(await self.update(item_id, changes))
+        return results
+
+    async def delete_many(self, item_ids: Sequence[str]) -> List[bool]:
+        """Delete many items, returning whether each existed"""
+        results = []
+        for index, item_id in enumerate(item_ids):
+            await pause_between_chunks(index)
+            results.append(await self.delete(item_id))
+        return results
+
+    @abstractmethod
+    async def adjust_stock(
+        self,
+        item_id: str,
+        quantity_change: int,
+        updated_at: datetime,
+        reference: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Atomically add ``quantity_change`` to an item's quantity and append
+        the movement to the item's stock log.
+
+        Returns the item, or None if missing. Raises InsufficientStockError
+        if the quantity would drop below zero.
+        """
+
+    async def adjust_stock_many(
+        self, adjustments: Sequence[Tuple[str, int, Optional[str]]], updated_at: datetime
+    ) -> List[Union[dict, None, InsufficientStockError]]:
+        """
+        Apply ``(item_id, quantity_change, reference)`` adjustments in order,
+        returning each item, None if missing, or an InsufficientStockError
+        """
+        results = []
+        for index, (item_id, quantity_change, reference) in enumerate(adjustments):
+            await pause_between_chunks(index)
+            try:
+                results.append(await self.adjust_stock(item_id, quantity_change, updated_at, reference))
+            except InsufficientStockError as exc:
+                results.append(exc)
+        return results
+
+    @abstractmethod
+    async def stock_movements(
+        self, item_id: str, after: Optional[int] = None, limit: int = 100
+    ) -> List[dict]:
+        """An item's stock movements in the order applied, starting after movement ``after``"""
+
+    @abstractmethod
+    async def list(
+        self,
+        skip: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Page:
+        """
+        One page of items, in creation order or, when filtered, price order.
+
+        Raises ValueError for a cursor that does not belong to the query.
+        """
+
+    async def pages(self, page_size: int, **filters) -> AsyncIterator[List[dict]]:
+        """Every item matching ``filters``, one keyset page at a time"""
+        cursor = None
+        while True:
+            page, cursor = await self.list(0, page_size, cursor, **filters)
+            if page:
+                yield page
+            if cursor is None:
+                return
+
+
+class UserRepository(ABC):
+    """
+    Storage of user accounts.
+
+    The ``*_many`` methods apply a whole batch in one pass and report
+    failures per row instead of raising.
+    """
+
+    @abstractmethod
+    async def add(self, user: dict) -> dict:
+        """Store a new user, raising ConflictError on a taken email or username"""
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[dict]:
+        """User by ID, or None"""
+
+    @abstractmethod
+    async def update(self, user_id: str, changes: dict) -> Optional[dict]:
+        """
+        Apply field changes to a user, returning it, or None if missing.
+
+        Raises ConflictError if the new email belongs to another user.
+        """
+
+    @abstractmethod
+    async def delete(self, user_id: str) -> bool:
+        """Delete a user, returning whether it existed"""
+
+    async def add_many(self, users: Sequence[dict]) -> List[Optional[ConflictError]]:
+        """Store many new users, returning None or the ConflictError of each row"""
+        errors = []
+        for index, user in enumerate(users):
+            await pause_between_chunks(index)
+            try:
+                await self.add(user)
+                errors.append(None)
+            except ConflictError as exc:
+                errors.append(exc)
+        return errors
+
+    async def update_many(
+        self, updates: Sequence[Tuple[str, dict]]
+    ) -> List[Union[dict, None, ConflictError]]:
+        """Apply ``(user_id, changes)`` pairs, returning each user, None if missing, or a ConflictError"""
+        results = []
+        for index, (user_id, changes) in enumerate(updates):
+            await pause_between_chunks(index)
+            try:
+                results.append(await self.update(user_id, changes))
+            except ConflictError as exc:
+                results.append(exc)
+        return results
+
+    async def delete_many(self, user_ids: Sequence[str]) -> List[bool]:
+        """Delete many users, returning whether each existed"""
+        results = []
+        for index, user_id in enumerate(user_ids):
+            await pause_between_chunks(index)
+            results.append(await self.delete(user_id))
+        return results
+
+    @abstractmethod
+    async def list(
+        self,
+        skip: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ) -> Page:
+        """
+        One page of users in creation order.
+
+        Raises ValueError for a cursor that does not belong to the query.
+        """
+
+    async def pages(self, page_size: int, **filters) -> AsyncIterator[List[dict]]:
+        """Every user matching ``filters``, one keyset page at a time"""
+        cursor = None
+        while True:
+            page, cursor = await self.list(0, page_size, cursor, **filters)
+            if page:
+                yield page
+            if cursor is None:
+                return
+
+
+class Storage(ABC):
+    """A storage backend: the repositories plus their connection lifecycle"""
+
+    items: ItemRepository
+    users: UserRepository
+
+    async def connect(self) -> None:
+        """Open connections and prepare the schema"""
+
+    async def close(self) -> None:
+        """Release connections"""
@@ -0,0 +1,226 @@
+"""In-process storage backend"""
+from bisect import bisect_right
+from datetime import datetime
+from itertools import count
+from typing import Dict, List, Optional, Sequence
+import asyncio
+
+from app.core.indexes import HashIndex, SortedIndex, UniqueIndex
+from app.core.pagination import keyset_page
+from app.db.base import (
+    ConflictError, InsufficientStockError, ItemRepository, Page, Storage, UserRepository,
+    pause_between_chunks
+)
+
+
+class MemoryItemRepository(ItemRepository):
+    """
+    Items in a dict with secondary indexes: creation order, and price
+    order overall and per category.
+
+    Stock adjustments never await between reading and writing a quantity,
+    so on the event loop each one is atomic without any locking.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.created_index = SortedIndex()
+        self.price_index = SortedIndex()
+        self.category_index = HashIndex()
+        self.movements: Dict[str, List[dict]] = {}
+        self._movement_ids = count(1)
+
+    def _index(self, item: dict):
+        self.price_index.add(item["price"], item["id"])
+        self.category_index.add(item["category"], item["price"], item["id"])
+
+    def _unindex(self, item: dict):
+        self.price_index.remove(item["price"], item["id"])
+        self.category_index.remove(item["category"], item["price"], item["id"])
+
+    async def add(self, item: dict) -> dict:
+        self.items[item["id"]] = item
+        self.created_index.add(item["created_at"], item["id"])
+        self._index(item)
+        return item
+
+    async def add_many(self, items: Sequence[dict]) -> None:
+        # Each index is re-sorted once rather than inserted into per row;
+        # items are stored first, so a listing between the steps is valid
+        for item in items:
+            self.items[item["id"]] = item
+        self.created_index.add_many((item["created_at"], item["id"]) for item in items)
+        await asyncio.sleep(0)
+        self.price_index.add_many((item["price"], item["id"]) for item in items)
+        await asyncio.sleep(0)
+        self.category_index.add_many((item["category"], item["price"], item["id"]) for item in items)
+
+    async def get(self, item_id: str) -> Optional[dict]:
+        return self.items.get(item_id)
+
+    async def update(self, item_id: str, changes: dict) -> Optional[dict]:
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        self._unindex(item)
+        item.update(changes)
+        self._index(item)
+        return item
+
+    async def delete(self, item_id: str) -> bool:
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return False
+        self.created_index.remove(item["created_at"], item_id)
+        self._unindex(item)
+        self.movements.pop(item_id, None)
+        return True
+
+    async def adjust_stock(
+        self,
+        item_id: str,
+        quantity_change: int,
+        updated_at: datetime,
+        reference: Optional[str] = None
+    ) -> Optional[dict]:
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        new_quantity = item["quantity"] + quantity_change
+        if new_quantity < 0:
+            raise InsufficientStockError("Insufficient stock")
+        item["quantity"] = new_quantity
+        item["updated_at"] = updated_at
+        self.movements.setdefault(item_id, []).append({
+            "id": next(self._movement_ids),
+            "item_id": item_id,
+            "quantity_change": quantity_change,
+            "quantity": new_quantity,
+            "reference": reference,
+            "created_at": updated_at
+        })
+        return item
+
+    async def stock_movements(
+        self, item_id: str, after: Optional[int] = None, limit: int = 100
+    ) -> List[dict]:
+        log = self.movements.get(item_id, [])
+        first = 0 if after is None else bisect_right(log, after, key=_movement_id)
+        return log[first:first + limit]
+
+    async def list(
+        self,
+        skip: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Page:
+        if not category and min_price is None and max_price is None:
+            index, order = self.created_index, "created"
+        else:
+            index = self.category_index.get(category) if category else self.price_index
+            order = "price"
+        item_ids, next_cursor = keyset_page(index, order, cursor, skip, limit, min_price, max_price)
+        return [self.items[item_id] for item_id in item_ids], next_cursor
+
+
+def _movement_id(movement: dict) -> int:
+    return movement["id"]
+
+
+class MemoryUserRepository(UserRepository):
+    """
+    Users in a dict with unique indexes on email and username and
+    creation-order indexes, overall and by ``is_active``.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.email_index = UniqueIndex()
+        self.username_index = UniqueIndex()
+        self.created_index = SortedIndex()
+        self.active_index = HashIndex()
+
+    async def add(self, user: dict) -> dict:
+        user_id = user["id"]
+        if self.email_index.is_taken(user["email"]):
+            raise ConflictError("Email already registered")
+        if self.username_index.is_taken(user["username"]):
+            raise ConflictError("Username already taken")
+
+        self.users[user_id] = user
+        self.email_index.add(user["email"], user_id)
+        self.username_index.add(user["username"], user_id)
+        self.created_index.add(user["created_at"], user_id)
+        self.active_index.add(user["is_active"], user["created_at"], user_id)
+        return user
+
+    async def add_many(self, users: Sequence[dict]) -> List[Optional[ConflictError]]:
+        errors = []
+        added = []
+        for index, user in enumerate(users):
+            await pause_between_chunks(index)
+            user_id = user["id"]
+            if self.email_index.is_taken(user["email"]):
+                errors.append(ConflictError("Email already registered"))
+                continue
+            if self.username_index.is_taken(user["username"]):
+                errors.append(ConflictError("Username already taken"))
+                continue
+            self.users[user_id] = user
+            self.email_index.add(user["email"], user_id)
+            self.username_index.add(user["username"], user_id)
+            added.append(user)
+            errors.append(None)
+        self.created_index.add_many((user["created_at"], user["id"]) for user in added)
+        await asyncio.sleep(0)
+        self.active_index.add_many((user["is_active"], user["created_at"], user["id"]) for user in added)
+        return errors
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        return self.users.get(user_id)
+
+    async def update(self, user_id: str, changes: dict) -> Optional[dict]:
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        if "email" in changes and self.email_index.is_taken(changes["email"], user_id):
+            raise ConflictError("Email already registered")
+
+        self.email_index.remove(user["email"], user_id)
+        self.active_index.remove(user["is_active"], user["created_at"], user_id)
+        user.update(changes)
+        self.email_index.add(user["email"], user_id)
+        self.active_index.add(user["is_active"], user["created_at"], user_id)
+        return user
+
+    async def delete(self, user_id: str) -> bool:
+        user = self.users.pop(user_id, None)
+        if user is None:
+            return False
+        self.email_index.remove(user["email"], user_id)
+        self.username_index.remove(user["username"], user_id)
+        self.created_index.remove(user["created_at"], user_id)
+        self.active_index.remove(user["is_active"], user["created_at"], user_id)
+        return True
+
+    async def list(
+        self,
+        skip: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ) -> Page:
+        index = self.created_index if is_active is None else self.active_index.get(is_active)
+        user_ids, next_cursor = keyset_page(index, "created", cursor, skip, limit)
+        return [self.users[user_id] for user_id in user_ids], next_cursor
+
+
+class MemoryStorage(Storage):
+    """Process-local storage; data is lost on restart and not shared between workers"""
+
+    def __init__(self):
+        self.items = MemoryItemRepository()
+        self.users = MemoryUserRepository()
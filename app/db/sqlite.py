@@ -0,0 +1,450 @@
+"""SQLite storage backend built on aiosqlite"""
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
+
+import aiosqlite
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.db.base import (
+    ConflictError, InsufficientStockError, ItemRepository, Page, Storage, UserRepository
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    category TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_created ON items (created_at, id);
+CREATE INDEX IF NOT EXISTS items_price ON items (price, id);
+CREATE INDEX IF NOT EXISTS items_category_price ON items (category, price, id);
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id TEXT NOT NULL,
+    quantity_change INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    reference TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stock_movements_item ON stock_movements (item_id, id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    username TEXT NOT NULL UNIQUE,
+    full_name TEXT,
+    is_active INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_created ON users (created_at, id);
+CREATE INDEX IF NOT EXISTS users_active_created ON users (is_active, created_at, id);
+"""
+
+ITEM_COLUMNS = ("id", "name", "description", "price", "quantity", "category", "created_at", "updated_at")
+USER_COLUMNS = ("id", "email", "username", "full_name", "is_active", "created_at", "updated_at")
+
+# Statements are built from fixed column lists only, so sqlite3's per-connection
+# statement cache keeps them prepared across requests
+INSERT_ITEM = f"INSERT INTO items ({', '.join(ITEM_COLUMNS)}) VALUES ({', '.join('?' * len(ITEM_COLUMNS))})"
+INSERT_USER = f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})"
+SELECT_ITEM = "SELECT * FROM items WHERE id = ?"
+SELECT_USER = "SELECT * FROM users WHERE id = ?"
+DELETE_ITEM = "DELETE FROM items WHERE id = ? RETURNING id"
+DELETE_USER = "DELETE FROM users WHERE id = ? RETURNING id"
+ADJUST_STOCK = (
+    "UPDATE items SET quantity = quantity + ?, updated_at = ? "
+    "WHERE id = ? AND quantity + ? >= 0 RETURNING *"
+)
+INSERT_MOVEMENT = (
+    "INSERT INTO stock_movements (item_id, quantity_change, quantity, reference, created_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SELECT_MOVEMENTS = "SELECT * FROM stock_movements WHERE item_id = ? AND id > ? ORDER BY id LIMIT ?"
+DELETE_MOVEMENTS = "DELETE FROM stock_movements WHERE item_id = ?"
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO format, so text order matches time order
+    return value.isoformat(timespec="microseconds")
+
+
+def _to_row(record: dict, columns: Tuple[str, ...]) -> tuple:
+    return tuple(
+        _timestamp(record[column]) if isinstance(record[column], datetime) else record[column]
+        for column in columns
+    )
+
+
+def _item(row: sqlite3.Row) -> dict:
+    item = dict(row)
+    item["created_at"] = datetime.fromisoformat(item["created_at"])
+    item["updated_at"] = datetime.fromisoformat(item["updated_at"])
+    return item
+
+
+def _user(row: sqlite3.Row) -> dict:
+    user = dict(row)
+    user["is_active"] = bool(user["is_active"])
+    user["created_at"] = datetime.fromisoformat(user["created_at"])
+    user["updated_at"] = datetime.fromisoformat(user["updated_at"])
+    return user
+
+
+def _movement(row: sqlite3.Row) -> dict:
+    movement = dict(row)
+    movement["created_at"] = datetime.fromisoformat(movement["created_at"])
+    return movement
+
+
+async def _adjust_stock(
+    connection: aiosqlite.Connection,
+    item_id: str,
+    quantity_change: int,
+    updated_at: str,
+    reference: Optional[str]
+) -> Union[dict, None, InsufficientStockError]:
+    """Apply one stock adjustment and log it, returning the item, None if missing, or the error"""
+    # The check and the increment are one statement, so concurrent
+    # adjustments from any worker cannot oversell
+    async with connection.execute(
+        ADJUST_STOCK, (quantity_change, updated_at, item_id, quantity_change)
+    ) as cursor:
+        row = await cursor.fetchone()
+    if row is None:
+        async with connection.execute(SELECT_ITEM, (item_id,)) as cursor:
+            exists = await cursor.fetchone() is not None
+        return InsufficientStockError("Insufficient stock") if exists else None
+
+    await connection.execute(
+        INSERT_MOVEMENT, (item_id, quantity_change, row["quantity"], reference, updated_at)
+    )
+    return _item(row)
+
+
+def _conflict(error: sqlite3.IntegrityError) -> ConflictError:
+    if "users.username" in str(error):
+        return ConflictError("Username already taken")
+    return ConflictError("Email already registered")
+
+
+class ConnectionPool:
+    """
+    Fixed set of aiosqlite connections handed out one request at a time.
+
+    Connections use WAL journaling so readers never block on the writer,
+    and a busy timeout so writers from several workers queue up instead
+    of failing.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        # Every connection to an in-memory database would see its own database
+        self.size = 1 if path == ":memory:" else size
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def open(self) -> None:
+        # A fresh queue, so no connection closed earlier is handed out and
+        # the queue belongs to the event loop now using the pool
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            connection = await aiosqlite.connect(self.path, cached_statements=256)
+            connection.row_factory = sqlite3.Row
+            await connection.execute("PRAGMA journal_mode=WAL")
+            await connection.execute("PRAGMA busy_timeout=5000")
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        for connection in self._connections:
+            await connection.close()
+        self._connections.clear()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def fetch_one(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        async with self.acquire() as connection:
+            async with connection.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+
+    async def fetch_all(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        async with self.acquire() as connection:
+            async with connection.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Connection whose statements commit together, or roll back on error"""
+        async with self.acquire() as connection:
+            try:
+                yield connection
+                await connection.commit()
+            except BaseException:
+                await connection.rollback()
+                raise
+
+    async def write(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """Run one statement in its own transaction, returning any RETURNING rows"""
+        async with self.transaction() as connection:
+            async with connection.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+
+async def _update(
+    connection: aiosqlite.Connection,
+    table: str,
+    table_columns: Tuple[str, ...],
+    record_id: str,
+    changes: dict
+) -> List[sqlite3.Row]:
+    """Apply field changes to one row, returning it, or nothing if missing"""
+    columns = tuple(sorted(column for column in changes if column in table_columns and column != "id"))
+    if not columns:
+        sql, params = f"SELECT * FROM {table} WHERE id = ?", (record_id,)
+    else:
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        sql = f"UPDATE {table} SET {assignments} WHERE id = ? RETURNING *"
+        params = _to_row(changes, columns) + (record_id,)
+    async with connection.execute(sql, params) as cursor:
+        return await cursor.fetchall()
+
+
+def _keyset(order: str, cursor: Optional[str], columns: Tuple[str, str]) -> Tuple[List[str], list]:
+    """WHERE condition resuming after a cursor, for an ORDER BY over ``columns``"""
+    if not cursor:
+        return [], []
+    key, record_id = decode_cursor(cursor, order)
+    if order == "created":
+        if not isinstance(key, datetime):
+            raise ValueError("Cursor does not match this query")
+        key = _timestamp(key)
+    elif not isinstance(key, (int, float)):
+        raise ValueError("Cursor does not match this query")
+    return [f"({columns[0]}, {columns[1]}) > (?, ?)"], [key, record_id]
+
+
+def _page(rows: List[sqlite3.Row], limit: int, order: str, key_column: str, convert) -> Page:
+    records = [convert(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = records[-1]
+        next_cursor = encode_cursor(order, last[key_column], last["id"])
+    return records, next_cursor
+
+
+class SQLiteItemRepository(ItemRepository):
+    """Items table, with indexes matching each listing order"""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+
+    async def add(self, item: dict) -> dict:
+        await self.pool.write(INSERT_ITEM, _to_row(item, ITEM_COLUMNS))
+        return item
+
+    async def get(self, item_id: str) -> Optional[dict]:
+        row = await self.pool.fetch_one(SELECT_ITEM, (item_id,))
+        return _item(row) if row else None
+
+    async def update(self, item_id: str, changes: dict) -> Optional[dict]:
+        return (await self.update_many([(item_id, changes)]))[0]
+
+    async def delete(self, item_id: str) -> bool:
+        return (await self.delete_many([item_id]))[0]
+
+    async def add_many(self, items: Sequence[dict]) -> None:
+        async with self.pool.transaction() as connection:
+            await connection.executemany(INSERT_ITEM, [_to_row(item, ITEM_COLUMNS) for item in items])
+
+    async def update_many(self, updates: Sequence[Tuple[str, dict]]) -> List[Optional[dict]]:
+        results = []
+        async with self.pool.transaction() as connection:
+            for item_id, changes in updates:
+                rows = await _update(connection, "items", ITEM_COLUMNS, item_id, changes)
+                results.append(_item(rows[0]) if rows else None)
+        return results
+
+    async def delete_many(self, item_ids: Sequence[str]) -> List[bool]:
+        results = []
+        async with self.pool.transaction() as connection:
+            for item_id in item_ids:
+                async with connection.execute(DELETE_ITEM, (item_id,)) as cursor:
+                    results.append(bool(await cursor.fetchall()))
+                # Movements go with their item, so a reused ID starts a fresh log
+                await connection.execute(DELETE_MOVEMENTS, (item_id,))
+        return results
+
+    async def adjust_stock(
+        self,
+        item_id: str,
+        quantity_change: int,
+        updated_at: datetime,
+        reference: Optional[str] = None
+    ) -> Optional[dict]:
+        result = (await self.adjust_stock_many([(item_id, quantity_change, reference)], updated_at))[0]
+        if isinstance(result, InsufficientStockError):
+            raise result
+        return result
+
+    async def adjust_stock_many(
+        self, adjustments: Sequence[Tuple[str, int, Optional[str]]], updated_at: datetime
+    ) -> List[Union[dict, None, InsufficientStockError]]:
+        # Each adjustment and its log entry commit together; a rejected
+        # adjustment changes nothing and the rest of the batch still applies
+        timestamp = _timestamp(updated_at)
+        async with self.pool.transaction() as connection:
+            return [
+                await _adjust_stock(connection, item_id, quantity_change, timestamp, reference)
+                for item_id, quantity_change, reference in adjustments
+            ]
+
+    async def stock_movements(
+        self, item_id: str, after: Optional[int] = None, limit: int = 100
+    ) -> List[dict]:
+        rows = await self.pool.fetch_all(SELECT_MOVEMENTS, (item_id, after or 0, limit))
+        return [_movement(row) for row in rows]
+
+    async def list(
+        self,
+        skip: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Page:
+        if not category and min_price is None and max_price is None:
+            order, key_column = "created", "created_at"
+        else:
+            order, key_column = "price", "price"
+        conditions, params = _keyset(order, cursor, (key_column, "id"))
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if min_price is not None:
+            conditions.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price <= ?")
+            params.append(max_price)
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = await self.pool.fetch_all(
+            f"SELECT * FROM items {where}ORDER BY {key_column}, id LIMIT ? OFFSET ?",
+            (*params, limit + 1, skip)
+        )
+        return _page(rows, limit, order, key_column, _item)
+
+
+class SQLiteUserRepository(UserRepository):
+    """Users table; UNIQUE constraints enforce email and username uniqueness"""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+
+    async def add(self, user: dict) -> dict:
+        try:
+            await self.pool.write(INSERT_USER, _to_row(user, USER_COLUMNS))
+        except sqlite3.IntegrityError as error:
+            raise _conflict(error) from error
+        return user
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        row = await self.pool.fetch_one(SELECT_USER, (user_id,))
+        return _user(row) if row else None
+
+    async def update(self, user_id: str, changes: dict) -> Optional[dict]:
+        result = (await self.update_many([(user_id, changes)]))[0]
+        if isinstance(result, ConflictError):
+            raise result
+        return result
+
+    async def delete(self, user_id: str) -> bool:
+        return bool(await self.pool.write(DELETE_USER, (user_id,)))
+
+    async def add_many(self, users: Sequence[dict]) -> List[Optional[ConflictError]]:
+        # A constraint violation only aborts its own statement, so the rest
+        # of the batch still commits in the same transaction
+        errors = []
+        async with self.pool.transaction() as connection:
+            for user in users:
+                try:
+                    await connection.execute(INSERT_USER, _to_row(user, USER_COLUMNS))
+                    errors.append(None)
+                except sqlite3.IntegrityError as error:
+                    errors.append(_conflict(error))
+        return errors
+
+    async def update_many(
+        self, updates: Sequence[Tuple[str, dict]]
+    ) -> List[Union[dict, None, ConflictError]]:
+        results = []
+        async with self.pool.transaction() as connection:
+            for user_id, changes in updates:
+                try:
+                    rows = await _update(connection, "users", USER_COLUMNS, user_id, changes)
+                    results.append(_user(rows[0]) if rows else None)
+                except sqlite3.IntegrityError as error:
+                    results.append(_conflict(error))
+        return results
+
+    async def delete_many(self, user_ids: Sequence[str]) -> List[bool]:
+        results = []
+        async with self.pool.transaction() as connection:
+            for user_id in user_ids:
+                async with connection.execute(DELETE_USER, (user_id,)) as cursor:
+                    results.append(bool(await cursor.fetchall()))
+        return results
+
+    async def list(
+        self,
+        skip: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ) -> Page:
+        conditions, params = _keyset("created", cursor, ("created_at", "id"))
+        if is_active is not None:
+            conditions.append("is_active = ?")
+            params.append(int(is_active))
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = await self.pool.fetch_all(
+            f"SELECT * FROM users {where}ORDER BY created_at, id LIMIT ? OFFSET ?",
+            (*params, limit + 1, skip)
+        )
+        return _page(rows, limit, "created", "created_at", _user)
+
+
+class SQLiteStorage(Storage):
+    """Durable storage in a SQLite database file shared by all workers"""
+
+    def __init__(self, path: str, pool_size: int):
+        self.pool = ConnectionPool(path, pool_size)
+        self.items = SQLiteItemRepository(self.pool)
+        self.users = SQLiteUserRepository(self.pool)
+
+    async def connect(self) -> None:
+        await self.pool.open()
+        async with self.pool.acquire() as connection:
+            await connection.executescript(SCHEMA)
+            await connection.commit()
+
+    async def close(self) -> None:
+        await self.pool.close()
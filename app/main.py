@@ -1,548 +1,516 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import (
+    FastAPI, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+)
+from fastapi.responses import HTMLResponse, ORJSONResponse
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+import asyncio
+import logging
 import platform
-import random
+
+from app.api.v1 import health, items, users
+from app.api.v1.batch import NDJSON_MEDIA_TYPES
+from app.core import metrics
+from app.core.alarms import DEFAULT_RULES, AlarmEngine
+from app.core.assets import AssetStore
+from app.core.broadcast import Broadcaster
+from app.core.cache import response_cache
+from app.core.command_log import MAX_KEY_LENGTH
+from app.core.commands import (
+    CommandLog, CommandQueue, CommandQueueFullError, IdempotencyConflictError
+)
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.fleet import CHANNEL_ROWS, CHANNELS, Fleet, machine_ids
+from app.core.history import History
+from app.core.http import etag_matches
+from app.core.ingest import (
+    MSGPACK_MEDIA_TYPES, IngestFormatError, Ingestor, QueueFullError, decode_msgpack, decode_ndjson
+)
+from app.core.shared_state import SUPPORTED as SHARED_STATE_SUPPORTED, SharedFleetState
+from app.core.simulation import MachineSimulator, encode
+from app.core.system import sampler
+from app.db import storage
+
+logger = logging.getLogger(__name__)
+
+broadcaster = Broadcaster()
+alarm_broadcaster = Broadcaster()
+metrics.stream_subscribers.function = lambda: (
+    broadcaster.subscriber_count + alarm_broadcaster.subscriber_count
+)
+
+metrics.cache_entries.function = lambda: len(response_cache)
+
+# Dashboard page and its hashed, precompressed assets, loaded once at startup
+assets = AssetStore(Path(__file__).parent / "static", prefix="/static")
+
+# Simulated fleet, advanced by a background task at a fixed tick rate.
+# The first machine backs the single-machine /api/machine routes. With
+# SHARED_STATE_NAME set, the state lives in shared memory so every worker
+# process serves the same fleet, and ``fleet`` is this worker's snapshot.
+fleet = Fleet(machine_ids(settings.FLEET_SIZE), seed=settings.SIMULATION_SEED)
+shared_state = (
+    SharedFleetState(
+        settings.SHARED_STATE_NAME,
+        fleet.ids,
+        seed=settings.SIMULATION_SEED,
+        command_capacity=settings.COMMAND_RESULT_CAPACITY
+    )
+    if settings.SHARED_STATE_NAME and SHARED_STATE_SUPPORTED else None
+)
+simulator = MachineSimulator(
+    fleet, settings.SIMULATION_TICK_SECONDS, shared_state, settings.SHARED_STATE_POLL_SECONDS
+)
+
+# Sensor history: one raw sample per tick plus 1-minute and 1-hour rollups,
+# each tier bounded to a fixed number of rows
+history = History(
+    capacity=settings.HISTORY_CAPACITY,
+    rollup_capacities={"1m": settings.HISTORY_MINUTE_CAPACITY, "1h": settings.HISTORY_HOUR_CAPACITY},
+    channels=len(CHANNELS),
+    machines=len(fleet),
+    sample_seconds=settings.SIMULATION_TICK_SECONDS,
+    max_points=settings.HISTORY_MAX_POINTS
+)
+simulator.add_tick_listener(lambda now: history.record(now, fleet.values))
+
+# Alarm rules checked against every machine on each tick
+alarms = AlarmEngine(DEFAULT_RULES, fleet.ids, settings.ALARM_LOG_CAPACITY)
+simulator.add_tick_listener(lambda now: alarms.evaluate(now, fleet.values))
+metrics.active_alarms.function = lambda: len(alarms.active)
+
+# Control commands, applied one at a time in submission order. Their log,
+# and with it every Idempotency-Key, is shared along with the fleet state.
+command_log = (
+    shared_state.command_log if shared_state is not None
+    else CommandLog(fleet.ids, settings.COMMAND_RESULT_CAPACITY)
+)
+commands = CommandQueue(
+    simulator, settings.COMMAND_QUEUE_SIZE, command_log, settings.SHARED_STATE_POLL_SECONDS
+)
+
+# Readings from field devices, applied in micro-batches between ticks.
+# History and alarms keep sampling the fleet at the tick rate.
+ingestor = Ingestor(simulator, settings.INGEST_QUEUE_SIZE)
+metrics.ingest_queue_depth.function = lambda: ingestor.depth
+
+
+def publish_state(payload: bytes):
+    """Push each pre-serialized snapshot to all stream subscribers"""
+    broadcaster.publish(payload.decode())
+
+
+simulator.add_listener(publish_state)
+
+
+def alarm_payload(events: Sequence[dict] = ()) -> bytes:
+    """Active alarm table plus the events that just changed it"""
+    return encode({"sequence": alarms.sequence, "active": alarms.active_alarms(), "events": events})
+
+
+alarms.add_listener(lambda events: alarm_broadcaster.publish(alarm_payload(events).decode()))
+alarm_broadcaster.publish(alarm_payload().decode())
+
+
+def report_failure(task: asyncio.Task) -> None:
+    """Log a background task that stopped with an error, as it should run until shutdown"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %r stopped", task.get_name(), exc_info=task.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await storage.connect()
+    tasks = [
+        asyncio.create_task(simulator.run(), name="simulator"),
+        asyncio.create_task(sampler.run(), name="system sampler"),
+        asyncio.create_task(ingestor.run(), name="ingestor"),
+        asyncio.create_task(commands.run(), name="commands")
+    ]
+    for task in tasks:
+        task.add_done_callback(report_failure)
+    yield
+    for task in tasks:
+        task.cancel()
+    # Failures were reported as they happened
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await response_cache.close()
+    await storage.close()
+
 
 app = FastAPI(
     title="SCADA Monitoring System",
     description="Industrial SCADA application for machine monitoring and control",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Simulated machine state
-machine_state = {
-    "running": True,
-    "speed": 75.0,
-    "temperature": 68.5,
-    "pressure": 4.2,
-    "vibration": 0.8,
-    "power": 85.0,
-    "production_count": 0,
-    "error_count": 0,
-    "last_maintenance": "2025-12-01",
-    "uptime_hours": 245.5
-}
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    cache_size=settings.COMPRESSION_CACHE_SIZE
+)
+# Added last so it wraps compression and records the bytes actually sent
+app.add_middleware(metrics.MetricsMiddleware)
+app.mount("/static", assets, name="static")
+app.include_router(health.router, prefix=settings.API_V1_STR, tags=["health"])
+app.include_router(items.router, prefix=settings.API_V1_STR, tags=["items"])
+app.include_router(users.router, prefix=settings.API_V1_STR, tags=["users"])
 
 
 @app.get("/", response_class=HTMLResponse)
-async def home():
+async def home(request: Request):
     """SCADA Dashboard - Main monitoring interface"""
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>SCADA Monitoring System</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: #0a0e27;
-                color: #fff;
-                padding: 20px;
-            }
-            .header {
-                background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
-                padding: 20px 30px;
-                border-radius: 10px;
-                margin-bottom: 20px;
-                box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
-            }
-            .header h1 {
-                font-size: 2em;
-                margin-bottom: 5px;
-            }
-            .header .subtitle {
-                color: #b3d4fc;
-                font-size: 0.9em;
-            }
-            .dashboard {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-                gap: 20px;
-                margin-bottom: 20px;
-            }
-            .card {
-                background: linear-gradient(135deg, #1a1f3a 0%, #2d3561 100%);
-                border-radius: 10px;
-                padding: 25px;
-                box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-                border: 1px solid #2a5298;
-            }
-            .card h3 {
-                color: #4a9eff;
-                margin-bottom: 15px;
-                font-size: 1.1em;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-            }
-            .machine-visual {
-                grid-column: 1 / -1;
-                text-align: center;
-                padding: 30px;
-            }
-            .machine-icon {
-                font-size: 120px;
-                margin-bottom: 20px;
-                animation: pulse 2s infinite;
-            }
-            @keyframes pulse {
-                0%, 100% { opacity: 1; }
-                50% { opacity: 0.7; }
-            }
-            .machine-status {
-                font-size: 1.5em;
-                font-weight: bold;
-                margin-top: 10px;
-            }
-            .status-running { color: #10b981; }
-            .status-stopped { color: #ef4444; }
-            .status-warning { color: #f59e0b; }
-            
-            .indicator {
-                margin-bottom: 20px;
-            }
-            .indicator-label {
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 8px;
-                font-size: 0.9em;
-            }
-            .indicator-value {
-                font-size: 1.8em;
-                font-weight: bold;
-                color: #4a9eff;
-            }
-            .indicator-unit {
-                font-size: 0.8em;
-                color: #b3d4fc;
-                margin-left: 5px;
-            }
-            .progress-bar {
-                width: 100%;
-                height: 12px;
-                background: #0a0e27;
-                border-radius: 10px;
-                overflow: hidden;
-                margin-top: 8px;
-            }
-            .progress-fill {
-                height: 100%;
-                background: linear-gradient(90deg, #4a9eff 0%, #00d4ff 100%);
-                transition: width 0.5s ease;
-                border-radius: 10px;
-            }
-            .progress-fill.warning {
-                background: linear-gradient(90deg, #f59e0b 0%, #fbbf24 100%);
-            }
-            .progress-fill.danger {
-                background: linear-gradient(90deg, #ef4444 0%, #f87171 100%);
-            }
-            
-            .control-panel {
-                display: flex;
-                gap: 10px;
-                flex-wrap: wrap;
-            }
-            .btn {
-                padding: 12px 24px;
-                border: none;
-                border-radius: 5px;
-                font-size: 1em;
-                cursor: pointer;
-                transition: all 0.3s;
-                font-weight: 600;
-                flex: 1;
-                min-width: 120px;
-            }
-            .btn-start {
-                background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-                color: white;
-            }
-            .btn-stop {
-                background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
-                color: white;
-            }
-            .btn-reset {
-                background: linear-gradient(135deg, #6366f1 0%, #4f46e5 100%);
-                color: white;
-            }
-            .btn:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 5px 15px rgba(0, 0, 0, 0.3);
-            }
-            .btn:disabled {
-                opacity: 0.5;
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            .stats-grid {
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 15px;
-            }
-            .stat-item {
-                background: #0a0e27;
-                padding: 15px;
-                border-radius: 8px;
-                text-align: center;
-            }
-            .stat-value {
-                font-size: 1.5em;
-                font-weight: bold;
-                color: #4a9eff;
-            }
-            .stat-label {
-                font-size: 0.8em;
-                color: #b3d4fc;
-                margin-top: 5px;
-            }
-            
-            .alarm-panel {
-                background: #1a0000;
-                border: 2px solid #ef4444;
-                padding: 15px;
-                border-radius: 8px;
-                display: none;
-            }
-            .alarm-panel.active {
-                display: block;
-                animation: blink 1s infinite;
-            }
-            @keyframes blink {
-                0%, 50%, 100% { opacity: 1; }
-                25%, 75% { opacity: 0.5; }
-            }
-            .alarm-text {
-                color: #ef4444;
-                font-weight: bold;
-                text-align: center;
-            }
-            
-            .timestamp {
-                text-align: center;
-                color: #b3d4fc;
-                margin-top: 20px;
-                font-size: 0.9em;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>⚙️ SCADA Monitoring System</h1>
-            <p class="subtitle">Industrial Machine Control & Data Acquisition</p>
-            <div class="timestamp" id="timestamp"></div>
-        </div>
-
-        <div class="dashboard">
-            <!-- Machine Visual Status -->
-            <div class="card machine-visual">
-                <div class="machine-icon" id="machine-icon">🏭</div>
-                <div class="machine-status" id="machine-status">Machine Running</div>
-                <div id="alarm-panel" class="alarm-panel">
-                    <div class="alarm-text">⚠️ ALARM: Critical Parameter Detected!</div>
-                </div>
-            </div>
-
-            <!-- Speed Indicator -->
-            <div class="card">
-                <h3>⚡ Motor Speed</h3>
-                <div class="indicator">
-                    <div class="indicator-value">
-                        <span id="speed-value">0</span>
-                        <span class="indicator-unit">RPM</span>
-                    </div>
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="speed-bar"></div>
-                    </div>
-                </div>
-                <div class="indicator-label">
-                    <span>Target: 1500 RPM</span>
-                    <span id="speed-percent">0%</span>
-                </div>
-            </div>
-
-            <!-- Temperature Indicator -->
-            <div class="card">
-                <h3>🌡️ Temperature</h3>
-                <div class="indicator">
-                    <div class="indicator-value">
-                        <span id="temp-value">0</span>
-                        <span class="indicator-unit">°C</span>
-                    </div>
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="temp-bar"></div>
-                    </div>
-                </div>
-                <div class="indicator-label">
-                    <span>Max: 95°C</span>
-                    <span id="temp-percent">0%</span>
-                </div>
-            </div>
-
-            <!-- Pressure Indicator -->
-            <div class="card">
-                <h3>💨 Pressure</h3>
-                <div class="indicator">
-                    <div class="indicator-value">
-                        <span id="pressure-value">0</span>
-                        <span class="indicator-unit">bar</span>
-                    </div>
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="pressure-bar"></div>
-                    </div>
-                </div>
-                <div class="indicator-label">
-                    <span>Max: 6.5 bar</span>
-                    <span id="pressure-percent">0%</span>
-                </div>
-            </div>
-
-            <!-- Vibration Indicator -->
-            <div class="card">
-                <h3>📊 Vibration</h3>
-                <div class="indicator">
-                    <div class="indicator-value">
-                        <span id="vibration-value">0</span>
-                        <span class="indicator-unit">mm/s</span>
-                    </div>
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="vibration-bar"></div>
-                    </div>
-                </div>
-                <div class="indicator-label">
-                    <span>Max: 3.0 mm/s</span>
-                    <span id="vibration-percent">0%</span>
-                </div>
-            </div>
-
-            <!-- Power Consumption -->
-            <div class="card">
-                <h3>⚡ Power Consumption</h3>
-                <div class="indicator">
-                    <div class="indicator-value">
-                        <span id="power-value">0</span>
-                        <span class="indicator-unit">kW</span>
-                    </div>
-                    <div class="progress-bar">
-                        <div class="progress-fill" id="power-bar"></div>
-                    </div>
-                </div>
-                <div class="indicator-label">
-                    <span>Max: 120 kW</span>
-                    <span id="power-percent">0%</span>
-                </div>
-            </div>
-
-            <!-- Production Statistics -->
-            <div class="card">
-                <h3>📈 Production Stats</h3>
-                <div class="stats-grid">
-                    <div class="stat-item">
-                        <div class="stat-value" id="production-count">0</div>
-                        <div class="stat-label">Units Produced</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value" id="error-count">0</div>
-                        <div class="stat-label">Errors</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value" id="uptime">0.0</div>
-                        <div class="stat-label">Uptime (hrs)</div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-value" id="efficiency">0</div>
-                        <div class="stat-label">Efficiency %</div>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Control Panel -->
-            <div class="card">
-                <h3>🎛️ Control Panel</h3>
-                <div class="control-panel">
-                    <button class="btn btn-start" id="btn-start" onclick="startMachine()">▶️ Start</button>
-                    <button class="btn btn-stop" id="btn-stop" onclick="stopMachine()">⏹️ Stop</button>
-                    <button class="btn btn-reset" onclick="resetCounters()">🔄 Reset</button>
-                </div>
-                <div style="margin-top: 15px; padding: 10px; background: #0a0e27; border-radius: 5px; font-size: 0.85em;">
-                    <div>Last Maintenance: <span id="last-maintenance">2025-12-01</span></div>
-                </div>
-            </div>
-        </div>
-
-        <script>
-            let machineRunning = false;
-            let productionCount = 0;
-            let errorCount = 0;
-            let uptimeHours = 0;
-
-            function updateTimestamp() {
-                const now = new Date();
-                document.getElementById('timestamp').textContent = 
-                    'System Time: ' + now.toLocaleString();
-            }
-
-            function updateIndicator(id, value, max) {
-                const percent = Math.min((value / max) * 100, 100);
-                document.getElementById(id + '-value').textContent = value.toFixed(1);
-                document.getElementById(id + '-percent').textContent = percent.toFixed(0) + '%';
-                
-                const bar = document.getElementById(id + '-bar');
-                bar.style.width = percent + '%';
-                
-                // Color coding based on percentage
-                bar.className = 'progress-fill';
-                if (percent > 90) {
-                    bar.classList.add('danger');
-                } else if (percent > 75) {
-                    bar.classList.add('warning');
-                }
-                
-                return percent;
-            }
-
-            async function fetchMachineData() {
-                try {
-                    const response = await fetch('/api/machine/status');
-                    const data = await response.json();
-                    
-                    machineRunning = data.running;
-                    
-                    // Update machine status
-                    const statusEl = document.getElementById('machine-status');
-                    const iconEl = document.getElementById('machine-icon');
-                    const alarmEl = document.getElementById('alarm-panel');
-                    
-                    if (data.running) {
-                        statusEl.textContent = 'Machine Running';
-                        statusEl.className = 'machine-status status-running';
-                        iconEl.style.animation = 'pulse 1s infinite';
-                    } else {
-                        statusEl.textContent = 'Machine Stopped';
-                        statusEl.className = 'machine-status status-stopped';
-                        iconEl.style.animation = 'none';
-                    }
-                    
-                    // Update indicators
-                    updateIndicator('speed', data.speed * 20, 1500); // Convert to RPM
-                    const tempPercent = updateIndicator('temp', data.temperature, 95);
-                    const pressurePercent = updateIndicator('pressure', data.pressure, 6.5);
-                    const vibrationPercent = updateIndicator('vibration', data.vibration, 3.0);
-                    updateIndicator('power', data.power, 120);
-                    
-                    // Check for alarms
-                    if (tempPercent > 90 || pressurePercent > 90 || vibrationPercent > 85) {
-                        alarmEl.classList.add('active');
-                    } else {
-                        alarmEl.classList.remove('active');
-                    }
-                    
-                    // Update stats
-                    document.getElementById('production-count').textContent = data.production_count;
-                    document.getElementById('error-count').textContent = data.error_count;
-                    document.getElementById('uptime').textContent = data.uptime_hours.toFixed(1);
-                    
-                    const efficiency = data.running ? Math.min(100, 60 + Math.random() * 35) : 0;
-                    document.getElementById('efficiency').textContent = efficiency.toFixed(0);
-                    
-                    document.getElementById('last-maintenance').textContent = data.last_maintenance;
-                    
-                    // Update button states
-                    document.getElementById('btn-start').disabled = data.running;
-                    document.getElementById('btn-stop').disabled = !data.running;
-                    
-                } catch (error) {
-                    console.error('Error fetching machine data:', error);
-                }
-            }
-
-            async function startMachine() {
-                await fetch('/api/machine/start', { method: 'POST' });
-                fetchMachineData();
-            }
-
-            async function stopMachine() {
-                await fetch('/api/machine/stop', { method: 'POST' });
-                fetchMachineData();
-            }
-
-            async function resetCounters() {
-                await fetch('/api/machine/reset', { method: 'POST' });
-                fetchMachineData();
-            }
-
-            // Update every second
-            updateTimestamp();
-            setInterval(updateTimestamp, 1000);
-            
-            fetchMachineData();
-            setInterval(fetchMachineData, 2000);
-        </script>
-    </body>
-    </html>
-    """
-    return html_content
+    return assets.index.response(request)
+
+
+def versioned_response(request: Request, payload: bytes) -> Response:
+    """Serve a payload encoded at commit time, tagged with the state version"""
+    headers = {"ETag": simulator.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, simulator.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+def machine_index(machine_id: str) -> int:
+    """Resolve a machine ID to its fleet row"""
+    if machine_id not in fleet.index:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Machine not found"
+        )
+    return fleet.index[machine_id]
 
 
 @app.get("/api/machine/status")
-async def get_machine_status():
+async def get_machine_status(request: Request):
     """Get current machine status and all sensor readings"""
-    # Simulate sensor fluctuations when running
-    if machine_state["running"]:
-        machine_state["speed"] = max(0, min(100, machine_state["speed"] + random.uniform(-3, 3)))
-        machine_state["temperature"] = max(20, min(95, machine_state["temperature"] + random.uniform(-2, 2)))
-        machine_state["pressure"] = max(0, min(6.5, machine_state["pressure"] + random.uniform(-0.3, 0.3)))
-        machine_state["vibration"] = max(0, min(3, machine_state["vibration"] + random.uniform(-0.2, 0.2)))
-        machine_state["power"] = max(0, min(120, machine_state["power"] + random.uniform(-5, 5)))
-        machine_state["uptime_hours"] += 0.0006  # Increment uptime
-        
-        # Simulate production
-        if random.random() > 0.7:
-            machine_state["production_count"] += 1
-        
-        # Simulate occasional errors
-        if random.random() > 0.95:
-            machine_state["error_count"] += 1
-    
-    return machine_state
+    simulator.sync()
+    return versioned_response(request, simulator.payload)
+
+
+def history_response(
+    request: Request,
+    index: int,
+    channel: str,
+    start: Optional[float],
+    end: Optional[float],
+    step: Optional[float],
+    resolution: str,
+    points: Optional[int]
+) -> Response:
+    """
+    Range query over one channel of a machine's sensor history, tagged
+    with the history revision so unchanged results are not re-sent
+    """
+    if channel not in CHANNEL_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown channel, expected one of: {', '.join(CHANNELS)}"
+        )
+    if resolution not in history.resolutions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown resolution, expected one of: {', '.join(history.resolutions)}"
+        )
+    headers = {"ETag": history.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, history.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    series = history.query(CHANNEL_ROWS[channel], index, start, end, step, resolution, points)
+    payload = encode({"id": fleet.ids[index], "channel": channel, **series})
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@app.get("/api/machine/history")
+async def get_machine_history(
+    request: Request,
+    channel: str,
+    start: Optional[float] = Query(None, alias="from", description="Unix timestamp, inclusive"),
+    end: Optional[float] = Query(None, alias="to", description="Unix timestamp, inclusive"),
+    step: Optional[float] = Query(None, gt=0, description="Minimum seconds between samples"),
+    resolution: str = Query("auto", description="raw, 1m, 1h, or auto to pick by range"),
+    points: Optional[int] = Query(None, ge=3, description="Downsample to at most this many points (LTTB)")
+):
+    """Get the recorded history of one sensor channel"""
+    return history_response(request, 0, channel, start, end, step, resolution, points)
+
+
+async def stream_broadcasts(websocket: WebSocket, source: Broadcaster):
+    """Forward every message published by ``source`` until the client disconnects"""
+    await websocket.accept()
+    queue = source.subscribe()
+
+    async def forward():
+        while True:
+            await websocket.send_text(await queue.get())
+
+    # Sending runs in its own task so a disconnect is noticed right away,
+    # even while no updates are being published
+    sender = asyncio.create_task(forward())
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except WebSocketDisconnect:
+        pass
+    finally:
+        source.unsubscribe(queue)
+        sender.cancel()
+        # Sending fails once the client is gone, which is expected here
+        with suppress(asyncio.CancelledError, Exception):
+            await sender
+
+
+@app.websocket("/api/machine/stream")
+async def machine_status_stream(websocket: WebSocket):
+    """Push machine status updates to the dashboard as they are produced"""
+    await stream_broadcasts(websocket, broadcaster)
+
+
+COMMAND_MESSAGES = {"start": "Machine started", "stop": "Machine stopped", "reset": "Counters reset"}
+
+
+async def control_response(
+    action: str, index: int, idempotency_key: Optional[str], extra: Optional[dict] = None
+) -> Response:
+    """
+    Queue a control command and wait for it to be applied. A repeated
+    Idempotency-Key returns the original command instead of applying it
+    again; a command not applied in time is answered with 202.
+    """
+    try:
+        command, replayed = commands.submit(action, index, idempotency_key)
+    except IdempotencyConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    except CommandQueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"}
+        )
+    command = await commands.wait(command, settings.COMMAND_WAIT_SECONDS)
+    await response_cache.invalidate("machine")
+    if command["status"] == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Command failed: {command['error']}"
+        )
+
+    headers = {"Location": f"/api/machine/commands/{command['id']}"}
+    if replayed:
+        headers["Idempotent-Replayed"] = "true"
+    if command["status"] == "queued":
+        return ORJSONResponse(
+            {"status": "Command queued", **(extra or {}), "command": command},
+            status_code=status.HTTP_202_ACCEPTED,
+            headers=headers
+        )
+    return ORJSONResponse(
+        {
+            "status": COMMAND_MESSAGES[action],
+            **(extra or {}),
+            "timestamp": command["completed_at"],
+            "command": command
+        },
+        headers=headers
+    )
+
+
+IdempotencyKey = Header(
+    None,
+    alias="Idempotency-Key",
+    max_length=MAX_KEY_LENGTH,
+    description="Repeat requests with the same key are applied once"
+)
 
 
 @app.post("/api/machine/start")
-async def start_machine():
+async def start_machine(idempotency_key: Optional[str] = IdempotencyKey):
     """Start the machine"""
-    machine_state["running"] = True
-    machine_state["speed"] = 75.0
-    machine_state["temperature"] = 68.5
-    machine_state["pressure"] = 4.2
-    machine_state["vibration"] = 0.8
-    machine_state["power"] = 85.0
-    return {"status": "Machine started", "timestamp": datetime.utcnow().isoformat()}
+    return await control_response("start", 0, idempotency_key)
 
 
 @app.post("/api/machine/stop")
-async def stop_machine():
+async def stop_machine(idempotency_key: Optional[str] = IdempotencyKey):
     """Stop the machine"""
-    machine_state["running"] = False
-    machine_state["speed"] = 0.0
-    machine_state["power"] = 0.0
-    return {"status": "Machine stopped", "timestamp": datetime.utcnow().isoformat()}
+    return await control_response("stop", 0, idempotency_key)
 
 
 @app.post("/api/machine/reset")
-async def reset_counters():
+async def reset_counters(idempotency_key: Optional[str] = IdempotencyKey):
     """Reset production counters"""
-    machine_state["production_count"] = 0
-    machine_state["error_count"] = 0
-    machine_state["uptime_hours"] = 0.0
-    return {"status": "Counters reset", "timestamp": datetime.utcnow().isoformat()}
+    return await control_response("reset", 0, idempotency_key)
+
+
+@app.get("/api/machine/commands/{command_id}")
+async def get_command(command_id: str):
+    """Status of a recent control command"""
+    command = commands.get(command_id)
+    if command is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Command not found"
+        )
+    return command
+
+
+@app.get("/api/machines")
+async def list_machines():
+    """List the IDs of all machines in the fleet"""
+    return fleet.ids
+
+
+@app.get("/api/machines/status")
+async def get_fleet_status(
+    request: Request,
+    ids: Optional[str] = Query(None, description="Comma-separated machine IDs; all machines if omitted")
+):
+    """Get the status of many machines in one response"""
+    simulator.sync()
+    if ids is None:
+        return versioned_response(request, simulator.fleet_payload())
+    indices = [machine_index(machine_id) for machine_id in ids.split(",") if machine_id]
+    return versioned_response(request, encode(fleet.statuses(indices)))
+
+
+@app.get("/api/machines/{machine_id}/status")
+async def get_fleet_machine_status(machine_id: str, request: Request):
+    """Get the status of a single machine"""
+    simulator.sync()
+    return versioned_response(request, simulator.machine_payload(machine_index(machine_id)))
+
+
+@app.get("/api/machines/{machine_id}/history")
+async def get_fleet_machine_history(
+    request: Request,
+    machine_id: str,
+    channel: str,
+    start: Optional[float] = Query(None, alias="from", description="Unix timestamp, inclusive"),
+    end: Optional[float] = Query(None, alias="to", description="Unix timestamp, inclusive"),
+    step: Optional[float] = Query(None, gt=0, description="Minimum seconds between samples"),
+    resolution: str = Query("auto", description="raw, 1m, 1h, or auto to pick by range"),
+    points: Optional[int] = Query(None, ge=3, description="Downsample to at most this many points (LTTB)")
+):
+    """Get the recorded history of one sensor channel of a machine"""
+    return history_response(request, machine_index(machine_id), channel, start, end, step, resolution, points)
+
+
+@app.post("/api/machines/{machine_id}/start")
+async def start_fleet_machine(machine_id: str, idempotency_key: Optional[str] = IdempotencyKey):
+    """Start a machine"""
+    return await control_response("start", machine_index(machine_id), idempotency_key, {"id": machine_id})
+
+
+@app.post("/api/machines/{machine_id}/stop")
+async def stop_fleet_machine(machine_id: str, idempotency_key: Optional[str] = IdempotencyKey):
+    """Stop a machine"""
+    return await control_response("stop", machine_index(machine_id), idempotency_key, {"id": machine_id})
+
+
+@app.post("/api/machines/{machine_id}/reset")
+async def reset_fleet_machine(machine_id: str, idempotency_key: Optional[str] = IdempotencyKey):
+    """Reset a machine's production counters"""
+    return await control_response("reset", machine_index(machine_id), idempotency_key, {"id": machine_id})
+
+
+@app.get("/api/alarms")
+async def get_alarms(machine: Optional[str] = None, severity: Optional[str] = None):
+    """Currently active alarms, optionally for one machine or severity"""
+    return {"sequence": alarms.sequence, "active": alarms.active_alarms(machine, severity)}
+
+
+@app.get("/api/alarms/events")
+async def get_alarm_events(
+    after: Optional[int] = Query(None, ge=0, description="Return events after this event ID"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Raised and cleared alarm events from the bounded event log, oldest first"""
+    return alarms.events_after(after, limit)
+
+
+@app.get("/api/alarms/rules")
+async def get_alarm_rules():
+    """Alarm rules evaluated on every tick"""
+    return [rule.describe() for rule in alarms.rules]
+
+
+@app.websocket("/api/alarms/stream")
+async def alarm_stream(websocket: WebSocket):
+    """Push the active alarm table and new events whenever an alarm changes"""
+    await stream_broadcasts(websocket, alarm_broadcaster)
+
+
+def decode_readings(body: bytes, media_type: str) -> list:
+    """Readings of an ingestion frame, by its content type"""
+    try:
+        if media_type in MSGPACK_MEDIA_TYPES:
+            readings = decode_msgpack(body)
+        elif media_type in NDJSON_MEDIA_TYPES or media_type in ("", "application/json"):
+            readings = decode_ndjson(body)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send NDJSON, a JSON array or a msgpack array of readings"
+            )
+    except IngestFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if len(readings) > settings.BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batches are limited to {settings.BATCH_MAX_ROWS} readings"
+        )
+    return readings
+
+
+@app.post("/api/ingest", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_readings(request: Request):
+    """
+    Queue a batch of sensor readings from field devices. Each reading is an
+    object with a ``machine`` ID and channel values, sent as NDJSON, a JSON
+    array or a msgpack array.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    readings = decode_readings(await request.body(), media_type)
+    try:
+        return await ingestor.submit(readings, settings.INGEST_SUBMIT_TIMEOUT_SECONDS)
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": "1"}
+        )
+
+
+@app.websocket("/api/ingest/stream")
+async def ingest_stream(websocket: WebSocket):
+    """
+    Receive batches of readings over a persistent connection: text frames
+    hold NDJSON or a JSON array, binary frames a msgpack array. Every frame
+    is acknowledged with its result. A frame is only read once the previous
+    one is queued, so a full queue slows the sender down.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            try:
+                if message.get("bytes") is not None:
+                    readings = decode_readings(message["bytes"], MSGPACK_MEDIA_TYPES[0])
+                else:
+                    readings = decode_readings(message["text"].encode(), NDJSON_MEDIA_TYPES[0])
+                result = await ingestor.submit(readings)
+            except HTTPException as exc:
+                result = {"status": exc.status_code, "error": exc.detail}
+            await websocket.send_text(encode(result).decode())
+    except WebSocketDisconnect:
+        pass
 
 
 @app.get("/api/health")
@@ -556,18 +524,27 @@ async def health_check():
 
 
 @app.get("/api/info")
+@response_cache.cached(tags=("machine",), ttl=1.0)
 async def system_info():
     """System information endpoint"""
+    simulator.sync()
     return {
         "application": "SCADA Monitoring System",
         "version": "1.0.0",
         "python_version": platform.python_version(),
         "platform": platform.system(),
         "timestamp": datetime.utcnow().isoformat(),
-        "machine_status": machine_state["running"]
+        "machine_status": simulator.snapshot["running"],
+        "fleet_size": len(fleet)
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request, simulation and stream metrics in the Prometheus text format"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000)
@@ -0,0 +1,216 @@
+let machineRunning = false;
+let productionCount = 0;
+let errorCount = 0;
+let uptimeHours = 0;
+let pollTimer = null;
+let streamConnected = false;
+let machineId = null;
+let alarmPollTimer = null;
+let latestAlarms = null;
+
+function updateTimestamp() {
+    const now = new Date();
+    document.getElementById('timestamp').textContent = 
+        'System Time: ' + now.toLocaleString();
+}
+
+function updateIndicator(id, value, max) {
+    const percent = Math.min((value / max) * 100, 100);
+    document.getElementById(id + '-value').textContent = value.toFixed(1);
+    document.getElementById(id + '-percent').textContent = percent.toFixed(0) + '%';
+
+    const bar = document.getElementById(id + '-bar');
+    bar.style.width = percent + '%';
+
+    // Color coding based on percentage
+    bar.className = 'progress-fill';
+    if (percent > 90) {
+        bar.classList.add('danger');
+    } else if (percent > 75) {
+        bar.classList.add('warning');
+    }
+
+    return percent;
+}
+
+function renderMachineData(data) {
+    machineRunning = data.running;
+    if (machineId !== data.id) {
+        machineId = data.id;
+        // Alarms that arrived before the first status were filtered out
+        if (latestAlarms !== null) {
+            renderAlarms(latestAlarms);
+        }
+    }
+
+    // Update machine status
+    const statusEl = document.getElementById('machine-status');
+    const iconEl = document.getElementById('machine-icon');
+
+    if (data.running) {
+        statusEl.textContent = 'Machine Running';
+        statusEl.className = 'machine-status status-running';
+        iconEl.style.animation = 'pulse 1s infinite';
+    } else {
+        statusEl.textContent = 'Machine Stopped';
+        statusEl.className = 'machine-status status-stopped';
+        iconEl.style.animation = 'none';
+    }
+
+    // Update indicators
+    updateIndicator('speed', data.speed * 20, 1500); // Convert to RPM
+    updateIndicator('temp', data.temperature, 95);
+    updateIndicator('pressure', data.pressure, 6.5);
+    updateIndicator('vibration', data.vibration, 3.0);
+    updateIndicator('power', data.power, 120);
+
+    // Update stats
+    document.getElementById('production-count').textContent = data.production_count;
+    document.getElementById('error-count').textContent = data.error_count;
+    document.getElementById('uptime').textContent = data.uptime_hours.toFixed(1);
+
+    const efficiency = data.running ? Math.min(100, 60 + Math.random() * 35) : 0;
+    document.getElementById('efficiency').textContent = efficiency.toFixed(0);
+
+    document.getElementById('last-maintenance').textContent = data.last_maintenance;
+
+    // Update button states
+    document.getElementById('btn-start').disabled = data.running;
+    document.getElementById('btn-stop').disabled = !data.running;
+}
+
+async function fetchMachineData() {
+    try {
+        const response = await fetch('/api/machine/status');
+        renderMachineData(await response.json());
+    } catch (error) {
+        console.error('Error fetching machine data:', error);
+    }
+}
+
+// Polling is only used while the status stream is unavailable
+function startPolling() {
+    if (pollTimer === null) {
+        fetchMachineData();
+        pollTimer = setInterval(fetchMachineData, 2000);
+    }
+}
+
+function stopPolling() {
+    if (pollTimer !== null) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
+function connectStream() {
+    if (!('WebSocket' in window)) {
+        startPolling();
+        return;
+    }
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(protocol + '//' + window.location.host + '/api/machine/stream');
+    socket.onopen = function() {
+        streamConnected = true;
+        stopPolling();
+    };
+    socket.onmessage = function(event) {
+        renderMachineData(JSON.parse(event.data));
+    };
+    socket.onclose = function() {
+        streamConnected = false;
+        startPolling();
+        setTimeout(connectStream, 5000);
+    };
+}
+
+// Alarms are evaluated on the server; the panel shows this machine's active ones
+function renderAlarms(data) {
+    latestAlarms = data;
+    const alarms = data.active.filter(alarm => alarm.machine === machineId);
+    const alarmEl = document.getElementById('alarm-panel');
+    if (alarms.length > 0) {
+        alarmEl.querySelector('.alarm-text').textContent =
+            '⚠️ ALARM: ' + alarms.map(alarm => alarm.message).join(' · ');
+        alarmEl.classList.add('active');
+    } else {
+        alarmEl.classList.remove('active');
+    }
+}
+
+async function fetchAlarms() {
+    try {
+        const response = await fetch('/api/alarms');
+        renderAlarms(await response.json());
+    } catch (error) {
+        console.error('Error fetching alarms:', error);
+    }
+}
+
+function connectAlarmStream() {
+    if (!('WebSocket' in window)) {
+        alarmPollTimer = setInterval(fetchAlarms, 2000);
+        return;
+    }
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(protocol + '//' + window.location.host + '/api/alarms/stream');
+    socket.onopen = function() {
+        clearInterval(alarmPollTimer);
+        alarmPollTimer = null;
+    };
+    socket.onmessage = function(event) {
+        renderAlarms(JSON.parse(event.data));
+    };
+    socket.onclose = function() {
+        if (alarmPollTimer === null) {
+            alarmPollTimer = setInterval(fetchAlarms, 2000);
+        }
+        setTimeout(connectAlarmStream, 5000);
+    };
+}
+
+function refreshAfterCommand() {
+    // The stream pushes the new state on its own
+    if (!streamConnected) {
+        fetchMachineData();
+    }
+}
+
+async function sendCommand(action) {
+    // Retries of one click share its Idempotency-Key, so the server applies it once
+    const key = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    for (let attempt = 0; attempt < 3; attempt++) {
+        try {
+            const response = await fetch('/api/machine/' + action, {
+                method: 'POST',
+                headers: { 'Idempotency-Key': key }
+            });
+            if (response.status < 500) {
+                break;
+            }
+        } catch (error) {
+            console.error('Error sending ' + action + ' command:', error);
+        }
+    }
+    refreshAfterCommand();
+}
+
+async function startMachine() {
+    await sendCommand('start');
+}
+
+async function stopMachine() {
+    await sendCommand('stop');
+}
+
+async function resetCounters() {
+    await sendCommand('reset');
+}
+
+// Update every second
+updateTimestamp();
+setInterval(updateTimestamp, 1000);
+
+fetchMachineData();
+connectStream();
+connectAlarmStream();
@@ -0,0 +1,232 @@
+"""
+Throughput and latency benchmarks for the SCADA and CRUD endpoints.
+
+Runs in-process against ``app.main:app`` through httpx's ASGITransport,
+or against a running server with ``--url``. Each scenario reports req/s
+and p50/p95/p99 latency; list scenarios are repeated at every dataset
+size. The response cache is off in-process unless ``--cache`` is given,
+so list scenarios measure queries rather than cache hits; start a server
+with ``RESPONSE_CACHE_SIZE=0`` for the same with ``--url``. Results are
+written as JSON so runs can be compared:
+
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --compare baseline.json
+"""
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import time
+import uuid
+
+import httpx
+import numpy as np
+
+API = "/api/v1"
+SEED_BATCH = 5000
+CATEGORIES = ("tools", "parts", "sensors", "motors")
+
+Operation = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def measure(
+    client: httpx.AsyncClient, operation: Operation, requests: int, concurrency: int
+) -> dict:
+    """Run ``operation`` ``requests`` times from ``concurrency`` workers"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < requests:
+            started = time.perf_counter()
+            response = await operation(client)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 4),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(max(latencies) * 1000, 3)
+    }
+
+
+def new_item(n: int) -> dict:
+    return {
+        "name": f"item-{n}",
+        "price": round(1 + (n * 7919) % 10000 / 100, 2),
+        "quantity": 1000,
+        "category": CATEGORIES[n % len(CATEGORIES)]
+    }
+
+
+def new_user() -> dict:
+    token = uuid.uuid4().hex[:12]
+    return {"email": f"{token}@example.com", "username": f"user_{token}", "password": "benchmark"}
+
+
+async def seed(client: httpx.AsyncClient, current: int, size: int) -> None:
+    """Grow the item and user tables from ``current`` to ``size`` rows each"""
+    for first in range(current, size, SEED_BATCH):
+        count = min(SEED_BATCH, size - first)
+        for path, rows in (
+            (f"{API}/items:batch", [new_item(n) for n in range(first, first + count)]),
+            (f"{API}/users:batch", [new_user() for _ in range(count)])
+        ):
+            response = await client.post(path, json=rows)
+            response.raise_for_status()
+
+
+def static_scenarios(etag: Optional[str]) -> Dict[str, Operation]:
+    """Scenarios whose cost does not depend on the dataset size"""
+    return {
+        "machine_status": lambda client: client.get("/api/machine/status"),
+        "machine_status_etag": lambda client: client.get(
+            "/api/machine/status", headers={"If-None-Match": etag or ""}
+        ),
+        "dashboard": lambda client: client.get("/")
+    }
+
+
+def list_scenarios() -> Dict[str, Operation]:
+    """Scenarios whose cost may grow with the dataset"""
+    return {
+        "items_list": lambda client: client.get(f"{API}/items", params={"limit": 100}),
+        "items_list_deep": lambda client: client.get(f"{API}/items", params={"skip": 1000, "limit": 100}),
+        "items_by_category_price": lambda client: client.get(
+            f"{API}/items", params={"category": "sensors", "min_price": 20, "max_price": 60, "limit": 100}
+        ),
+        "users_active": lambda client: client.get(f"{API}/users", params={"is_active": True, "limit": 100})
+    }
+
+
+async def crud_mix(client: httpx.AsyncClient) -> httpx.Response:
+    """Create, read, update, adjust stock and delete one item"""
+    response = await client.post(f"{API}/items", json=new_item(0))
+    item_id = response.json()["id"]
+    await client.get(f"{API}/items/{item_id}")
+    await client.put(f"{API}/items/{item_id}", json={"price": 9.99})
+    await client.patch(f"{API}/items/{item_id}/stock", params={"quantity_change": -1})
+    return await client.delete(f"{API}/items/{item_id}")
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results = []
+    async with AsyncExitStack() as stack:
+        if args.url:
+            target = args.url
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.url))
+        else:
+            from app.main import app, response_cache
+
+            if not args.cache:
+                response_cache.max_entries = 0
+            target = "asgi:app.main:app"
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(transport=transport, base_url="http://benchmark")
+            )
+
+        def record(scenario: str, size: Optional[int], stats: dict):
+            results.append({"scenario": scenario, "dataset_size": size, **stats})
+            print(
+                f"{scenario:<26} {size if size is not None else '-':>8} "
+                f"{stats['rps']:>10.1f} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+                f"{stats['p99_ms']:>9.3f} {stats['errors']:>7}"
+            )
+
+        print(f"{'scenario':<26} {'rows':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        etag = (await client.get("/api/machine/status")).headers.get("etag")
+        for name, operation in static_scenarios(etag).items():
+            await measure(client, operation, args.warmup, args.concurrency)
+            record(name, None, await measure(client, operation, args.requests, args.concurrency))
+
+        size = 0
+        for target_size in args.sizes:
+            await seed(client, size, target_size)
+            size = target_size
+            for name, operation in list_scenarios().items():
+                await measure(client, operation, args.warmup, args.concurrency)
+                record(name, size, await measure(client, operation, args.requests, args.concurrency))
+            record("crud_mix", size, await measure(client, crud_mix, args.requests // 5, args.concurrency))
+
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "target": target,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database_url": os.environ.get("DATABASE_URL", "memory://"),
+            "response_cache": args.cache if not args.url else None,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "sizes": args.sizes
+        },
+        "results": results
+    }
+
+
+def compare(report: dict, baseline_path: str) -> None:
+    """Print the req/s and p95 change of every scenario also in the baseline"""
+    with open(baseline_path) as f:
+        baseline = {
+            (result["scenario"], result["dataset_size"]): result
+            for result in json.load(f)["results"]
+        }
+    print(f"\nChange against {baseline_path}")
+    print(f"{'scenario':<26} {'rows':>8} {'req/s':>9} {'p95':>9}")
+    for result in report["results"]:
+        before = baseline.get((result["scenario"], result["dataset_size"]))
+        if before is None:
+            continue
+        rps = (result["rps"] / before["rps"] - 1) * 100
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        size = result["dataset_size"] if result["dataset_size"] is not None else "-"
+        print(f"{result['scenario']:<26} {size:>8} {rps:>+8.1f}% {p95:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--sizes", type=lambda value: sorted(int(size) for size in value.split(",")),
+        default=[1000, 10000, 50000], help="comma-separated dataset sizes for the list scenarios"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="keep the in-process app's response cache on"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
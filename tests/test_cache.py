@@ -0,0 +1,108 @@
+"""Response cache invalidation across workers sharing a Redis tier"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import Response
+
+from app.core.cache import ResponseCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_worker(server, calls):
+    """A cache and a cached endpoint, as one worker process would have them"""
+    cache = ResponseCache(16, 60.0, redis_client=fakeredis.FakeAsyncRedis(server=server))
+
+    @cache.cached(tags=("item:{item_id}", "items:records"))
+    async def get_item(item_id: str):
+        calls.append(item_id)
+        return Response(f'{{"id":"{item_id}","call":{len(calls)}}}', media_type="application/json")
+
+    return cache, get_item
+
+
+def test_invalidation_reaches_other_workers():
+    async def scenario():
+        server, calls = fakeredis.FakeServer(), []
+        a, get_a = make_worker(server, calls)
+        b, get_b = make_worker(server, calls)
+
+        first = await get_a(item_id="1")
+        # Served from Redis, then from b's own tier
+        assert (await get_b(item_id="1")).body == first.body
+        assert (await get_b(item_id="1")).body == first.body
+        assert calls == ["1"]
+
+        await a.invalidate("item:1")
+        # b's in-process entry is stale as soon as a invalidates it
+        fresh = await get_b(item_id="1")
+        assert fresh.body != first.body
+        assert (await get_a(item_id="1")).body == fresh.body
+        assert calls == ["1", "1"]
+
+        # Other items keep their entries
+        await get_a(item_id="2")
+        await b.invalidate("item:1")
+        await get_b(item_id="2")
+        assert calls == ["1", "1", "2"]
+
+        await a.close()
+        await b.close()
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_state_is_bounded():
+    async def scenario():
+        cache = ResponseCache(16, 60.0, redis_client=fakeredis.FakeAsyncRedis(), tag_slots=8)
+        await cache.invalidate(*(f"item:{n}" for n in range(1000)))
+        assert len(cache._generations) == 8
+        assert await cache.redis.hlen(cache._tags_key) <= 8
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_redis_falls_back_to_process_tier():
+    async def scenario():
+        cache = ResponseCache(16, 60.0, redis_url="redis://127.0.0.1:1/0")
+        calls = []
+
+        @cache.cached(tags=("x",))
+        async def endpoint():
+            calls.append(1)
+            return {"ok": True}
+
+        assert (await endpoint()).body == (await endpoint()).body
+        assert len(calls) == 1
+        await cache.invalidate("x")
+        await endpoint()
+        assert len(calls) == 2
+        await cache.close()
+
+    if ResponseCache(1, 1.0, redis_url="redis://127.0.0.1:1/0").redis is None:
+        pytest.skip("redis is not installed")
+    asyncio.run(scenario())
+
+
+def test_matching_if_none_match_is_not_modified():
+    app, cache, calls = FastAPI(), ResponseCache(16, 60.0), []
+
+    @app.get("/items/{item_id}")
+    @cache.cached(tags=("item:{item_id}",))
+    async def get_item(item_id: str):
+        calls.append(item_id)
+        return {"id": item_id}
+
+    client = TestClient(app)
+    first = client.get("/items/1")
+    etag = first.headers["etag"]
+    assert client.get("/items/1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/items/1", headers={"If-None-Match": '"other"'}).content == first.content
+    # Tagged by content, so a recomputed but unchanged response still matches
+    asyncio.run(cache.invalidate("item:1"))
+    calls.clear()
+    assert client.get("/items/1", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == ["1"]
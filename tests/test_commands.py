@@ -0,0 +1,64 @@
+"""Idempotent control commands"""
+from multiprocessing import resource_tracker
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.command_log import CommandLog, IdempotencyConflictError
+from app.core.commands import CommandQueue
+from app.core.fleet import Fleet, machine_ids
+from app.core.shared_state import SUPPORTED, SharedFleetState
+from app.core.simulation import MachineSimulator
+
+
+def test_key_is_claimed_once():
+    log = CommandLog(machine_ids(2), capacity=4)
+    first, _, replayed = log.claim("start", 0, "retry-1")
+    assert not replayed
+    again, _, replayed = log.claim("start", 0, "retry-1")
+    assert replayed and again["id"] == first["id"]
+    with pytest.raises(IdempotencyConflictError):
+        log.claim("stop", 0, "retry-1")
+    # Keys go with their commands once the ring wraps
+    for _ in range(4):
+        log.claim("stop", 1)
+    assert log.get(first["id"]) is None
+    assert not log.claim("start", 0, "retry-1")[2]
+
+
+@pytest.mark.skipif(not SUPPORTED, reason="needs file locks")
+def test_keys_are_shared_between_workers():
+    name = f"scada-test-{uuid.uuid4().hex[:8]}"
+    ids = machine_ids(2)
+    workers = [SharedFleetState(name, ids, command_capacity=8) for _ in range(2)]
+    try:
+        command, slot, _ = workers[0].command_log.claim("reset", 1, "retry-1")
+        replay, _, replayed = workers[1].command_log.claim("reset", 1, "retry-1")
+        assert replayed and replay["id"] == command["id"]
+        workers[0].command_log.complete(slot, command["id"], version=7)
+        applied = workers[1].command_log.get(command["id"])
+        assert applied["status"] == "applied" and applied["version"] == 7
+    finally:
+        shm = workers[0]._shm
+        for worker in workers:
+            worker.close()
+        # Workers leave the block in place; the test removes it
+        resource_tracker.register(shm._name, "shared_memory")
+        shm.unlink()
+
+
+def test_queue_survives_a_new_event_loop():
+    simulator = MachineSimulator(Fleet(machine_ids(1), seed=1), tick_seconds=1.0)
+    commands = CommandQueue(simulator, queue_size=4, log=CommandLog(simulator.fleet.ids, 16))
+
+    async def apply(action):
+        consumer = asyncio.create_task(commands.run())
+        command, _ = commands.submit(action, 0)
+        command = await commands.wait(command, timeout=1.0)
+        consumer.cancel()
+        return command["status"]
+
+    # Each asyncio.run is a fresh loop, as with a second application lifespan
+    assert asyncio.run(apply("start")) == "applied"
+    assert asyncio.run(apply("stop")) == "applied"